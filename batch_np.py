@@ -0,0 +1,104 @@
+# Vectorized candidate computation and single-propagation over batches of
+# grids with NumPy. Grids are (N, 9, 9) uint8 arrays, 0 for empty; candidate
+# masks use bit (d-1) for digit d like solver.py. Only boards left STUCK need
+# the per-puzzle search (see solve_batch).
+import numpy as np
+import dlx
+from solver import GRID_SIZE, geometry
+
+SOLVED, STUCK, CONTRADICTION = 0, 1, 2
+STATUS_NAMES = {SOLVED: "solved", STUCK: "stuck", CONTRADICTION: "contradiction"}
+CHUNK = 65536
+
+_GEO = geometry()
+_POPCOUNT = np.array(_GEO.popcount, dtype=np.uint8)
+_DIGIT_OF = np.zeros(_GEO.all_digits + 1, dtype=np.uint8)
+for _bit, _k in _GEO.bit_index.items(): _DIGIT_OF[_bit] = _k + 1
+_SHIFTS = np.arange(GRID_SIZE, dtype=np.uint16)
+
+def parse_grids(lines):
+    # 81-character lines ('.' or '0' for empty) -> (N, 9, 9) uint8
+    raw = np.frombuffer("".join(line.strip() for line in lines).encode("ascii"), dtype=np.uint8)
+    raw = np.where(raw == ord("."), ord("0"), raw) - ord("0")
+    return raw.reshape(-1, GRID_SIZE, GRID_SIZE).astype(np.uint8)
+
+def _box_reduce(a, ufunc):
+    # (N, 9, 9, ...) -> per-box reduction broadcast back to (N, 9, 9, ...)
+    n = a.shape[0]; rest = a.shape[3:]
+    boxes = ufunc.reduce(ufunc.reduce(a.reshape((n, 3, 3, 3, 3) + rest), axis=4), axis=2)
+    return np.repeat(np.repeat(boxes, 3, axis=1), 3, axis=2)
+
+def candidate_masks(grids):
+    # 9-bit candidate mask per cell, 0 for filled cells
+    shift = np.maximum(grids, 1).astype(np.uint16) - 1
+    bits = np.where(grids > 0, np.uint16(1) << shift, 0).astype(np.uint16)
+    used = (np.bitwise_or.reduce(bits, axis=2)[:, :, None] |
+            np.bitwise_or.reduce(bits, axis=1)[:, None, :] |
+            _box_reduce(bits, np.bitwise_or))
+    return np.where(grids == 0, ~used & _GEO.all_digits, 0).astype(np.uint16)
+
+def _unit_counts(onehot):
+    # onehot (N, 9, 9, 9) -> row, column and box counts per digit, each broadcast to cells
+    rows = onehot.sum(axis=2, dtype=np.uint8)[:, :, None, :]
+    cols = onehot.sum(axis=1, dtype=np.uint8)[:, None, :, :]
+    boxes = _box_reduce(onehot.astype(np.uint8), np.add)
+    return rows, cols, boxes
+
+def _round(grids):
+    # One propagation round on a chunk: returns (new grids, contradiction flags, progress flags)
+    cand = candidate_masks(grids)
+    placed = grids[..., None] == np.arange(1, GRID_SIZE + 1, dtype=np.uint8)
+    options = ((cand[..., None] >> _SHIFTS) & 1).astype(bool)
+    p_rows, p_cols, p_boxes = _unit_counts(placed)
+    o_rows, o_cols, o_boxes = _unit_counts(options)
+    empty = grids == 0
+    bad = (empty & (cand == 0)).any(axis=(1, 2))
+    bad |= (p_rows > 1).any(axis=(1, 2, 3)) | (p_cols > 1).any(axis=(1, 2, 3)) | (p_boxes > 1).any(axis=(1, 2, 3))
+    bad |= ((p_rows + o_rows) == 0).any(axis=(1, 2, 3)) | ((p_cols + o_cols) == 0).any(axis=(1, 2, 3))
+    bad |= ((p_boxes + o_boxes) == 0).any(axis=(1, 2, 3))
+    hidden = options & ((o_rows == 1) | (o_cols == 1) | (o_boxes == 1))
+    hidden_count = hidden.sum(axis=3)
+    bad |= (hidden_count > 1).any(axis=(1, 2))
+    naked = _POPCOUNT[cand] == 1
+    value = np.where(naked, _DIGIT_OF[cand], np.where(hidden_count == 1, hidden.argmax(axis=3) + 1, 0)).astype(np.uint8)
+    value[bad] = 0
+    progress = (value > 0).any(axis=(1, 2))
+    return np.where(value > 0, value, grids), bad, progress
+
+def propagate(grids, max_rounds=GRID_SIZE * GRID_SIZE):
+    # Naked and hidden singles to a fixed point over the whole batch.
+    # Returns (reduced grids, status per board).
+    grids = np.array(grids, dtype=np.uint8, copy=True)
+    status = np.full(len(grids), STUCK, dtype=np.uint8)
+    for start in range(0, len(grids), CHUNK):
+        active = np.arange(start, min(start + CHUNK, len(grids)))
+        for _ in range(max_rounds):
+            if not len(active): break
+            new, bad, progress = _round(grids[active])
+            grids[active] = new
+            status[active[bad]] = CONTRADICTION
+            full = ~bad & ~(new == 0).any(axis=(1, 2))
+            # Singles placed together can still clash, so filled boards get one more check
+            if full.any():
+                filled = active[full]
+                _, clash, _ = _round(grids[filled])
+                status[filled] = np.where(clash, CONTRADICTION, SOLVED)
+            active = active[~bad & ~full & progress]
+        # Boards still active after max_rounds stay STUCK unless the last round broke them
+        if len(active):
+            _, bad, _ = _round(grids[active])
+            status[active[bad]] = CONTRADICTION
+    return grids, status
+
+def solve_batch(grids):
+    # Vectorized singles first, then the DLX search only for boards left stuck.
+    # A board that ends in a contradiction is returned unchanged.
+    grids = np.asarray(grids, dtype=np.uint8)
+    reduced, status = propagate(grids)
+    for i in np.flatnonzero(status == STUCK):
+        sol = dlx.solve(reduced[i].tolist())
+        if sol is None: status[i] = CONTRADICTION
+        else: reduced[i] = sol; status[i] = SOLVED
+    bad = status == CONTRADICTION
+    reduced[bad] = grids[bad]
+    return reduced, status
@@ -0,0 +1,163 @@
+# Benchmark harness for the solvers, techniques and the Next step walk.
+# Usage: python bench.py [--corpora easy,hard] [--benches dlx.solve,...] [--out results.json] [--compare base.json]
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import dlx
+import packed
+import solver
+import startup_time
+import steps
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpora")
+CORPORA = ["easy", "medium", "hard", "minimal17", "killers"]
+BACKTRACK_NODE_BUDGET = 50000
+MAX_STEPS = 500
+MEMORY_SAMPLE = 3
+
+def load_corpus(name):
+    path = name if os.path.exists(name) else os.path.join(CORPUS_DIR, name + ".txt")
+    if path.endswith(".sdk"): return list(packed.PackedCorpus(path))
+    with open(path) as f:
+        return [solver.parse_grid(line) for line in f if line.strip() and not line.startswith("#")]
+
+# Each bench is (prepare, run, reps): prepare(grid) is untimed, run(arg) is timed
+# and returns the node count (None when the search was cut off; steps taken for
+# the Next walk). With reps > 1 the best time per puzzle is kept.
+def _backtrack(g):
+    st = solver.SolverState(g)
+    try: solver.backtrack(st, BACKTRACK_NODE_BUDGET)
+    except solver.SearchAborted: return None
+    return st.nodes
+
+def _dlx_solve(g):
+    built = dlx.build_matrix(g)
+    if built is None: return 0
+    next(built[0].solutions(), None)
+    return built[0].nodes
+
+def _dlx_unique(g):
+    built = dlx.build_matrix(g)
+    if built is None: return 0
+    for count, _ in enumerate(built[0].solutions(), 1):
+        if count == 2: break
+    return built[0].nodes
+
+def _step_loop(st):
+    count = 0
+    for count, _ in enumerate(steps.iter_steps(st), 1):
+        if count >= MAX_STEPS: break
+    return count
+
+def _copy(g): return [row[:] for row in g]
+
+def _no_nodes(fn):
+    def run(arg):
+        fn(arg)
+        return 0
+    return run
+
+BENCHES = {
+    "solve_backtrack": (_copy, _backtrack, 1),
+    "dlx.solve": (_copy, _dlx_solve, 1),
+    "dlx.solve_unique": (_copy, _dlx_unique, 1),
+    "SolverState": (_copy, _no_nodes(solver.SolverState), 20),
+    "find_hidden_single": (solver.SolverState, _no_nodes(solver.find_hidden_single), 20),
+    "find_naked_pair": (solver.SolverState, _no_nodes(solver.find_naked_pair), 20),
+    "find_naked_trio": (solver.SolverState, _no_nodes(solver.find_naked_trio), 20),
+    "find_pointing": (solver.SolverState, _no_nodes(solver.find_pointing), 20),
+    "find_fish": (solver.SolverState, _no_nodes(lambda st: solver.find_fish(st, 3)), 20),
+    "step walk": (solver.SolverState, _step_loop, 1),
+}
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run_bench(prepare, run, reps, puzzles):
+    times = []; nodes = 0; aborted = 0
+    for g in puzzles:
+        best = None
+        for _ in range(reps):
+            arg = prepare(g)
+            t = time.perf_counter(); n = run(arg); dt = time.perf_counter() - t
+            best = dt if best is None else min(best, dt)
+        times.append(best)
+        if n is None: aborted += 1
+        else: nodes += n
+    tracemalloc.start()
+    for g in puzzles[:MEMORY_SAMPLE]: run(prepare(g))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    total = sum(times); times.sort()
+    return {
+        "puzzles": len(puzzles),
+        "aborted": aborted,
+        "puzzles_per_sec": len(puzzles) / total if total else None,
+        "p50_ms": percentile(times, 0.50) * 1000,
+        "p99_ms": percentile(times, 0.99) * 1000,
+        "mean_nodes": nodes / max(1, len(puzzles) - aborted),
+        "peak_kib": peak / 1024,
+    }
+
+def git_revision():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=CORPUS_DIR).stdout.strip() or None
+    except OSError: return None
+
+def compare(base, current, threshold):
+    # Prints p50 ratios against a previous run; returns the regressed (bench, corpus) pairs
+    regressions = []
+    for bench, corpora in current["results"].items():
+        for corpus, res in corpora.items():
+            old = base.get("results", {}).get(bench, {}).get(corpus)
+            if not old or not old["p50_ms"]: continue
+            ratio = res["p50_ms"] / old["p50_ms"]
+            flag = "  REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{bench:20s} {corpus:10s} p50 {old['p50_ms']:9.3f} -> {res['p50_ms']:9.3f} ms  x{ratio:5.2f}{flag}")
+            if flag: regressions.append((bench, corpus))
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark solvers and techniques over the bundled corpora.")
+    ap.add_argument("--corpora", default=",".join(CORPORA), help="comma-separated corpus names or file paths")
+    ap.add_argument("--benches", default=",".join(BENCHES), help="comma-separated bench names")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", help="previous results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown that counts as a regression")
+    args = ap.parse_args(argv)
+
+    corpora = {name: load_corpus(name) for name in args.corpora.split(",")}
+    results = {}
+    for bench in args.benches.split(","):
+        prepare, run, reps = BENCHES[bench]
+        results[bench] = {}
+        for name, puzzles in corpora.items():
+            res = run_bench(prepare, run, reps, puzzles)
+            results[bench][name] = res
+            print(f"{bench:20s} {name:10s} {res['puzzles_per_sec']:10.1f}/s  p50 {res['p50_ms']:9.3f} ms  "
+                  f"p99 {res['p99_ms']:9.3f} ms  nodes {res['mean_nodes']:10.1f}  peak {res['peak_kib']:8.1f} KiB"
+                  + (f"  aborted {res['aborted']}" if res['aborted'] else ""))
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "backtrack_node_budget": BACKTRACK_NODE_BUDGET,
+            "import": startup_time.measure(5),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f: json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f: base = json.load(f)
+        if compare(base, report, args.threshold): return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# Canonical form of a grid under the Sudoku symmetry group (transpose, band and
+# stack swaps, row and column swaps inside them, digit relabelling), and a
+# cache of per-puzzle results: uniqueness checks are keyed on the canonical
+# form so relabelled, rotated or transposed copies share one entry.
+import json
+import os
+import sqlite3
+from collections import OrderedDict, namedtuple
+from itertools import permutations, product
+import dlx
+from solver import GRID_SIZE, format_grid, parse_grid
+
+# canonical[r][c] = relabel[src[rows[r]][cols[c]]], src being the grid
+# transposed first when transpose is set; relabel[0] is 0
+Transform = namedtuple('Transform', 'transpose rows cols relabel')
+
+EMPTY_KEY = GRID_SIZE + 1
+MIN_UNIQUE_CLUES = 17
+_TRIPLES = list(permutations(range(3)))
+
+def _transposed(grid):
+    return [list(col) for col in zip(*grid)]
+
+def _first_row_columns(row):
+    # Column orders putting the row's clues as far left as possible: stacks by
+    # clue count, then clue columns first inside each stack
+    counts = [sum(1 for c in range(3 * s, 3 * s + 3) if row[c]) for s in range(3)]
+    stack_orders = [p for p in _TRIPLES if counts[p[0]] >= counts[p[1]] >= counts[p[2]]]
+    inner = []
+    for s in range(3):
+        present = [bool(row[3 * s + n]) for n in range(3)]
+        inner.append([tuple(3 * s + n for n in p) for p in _TRIPLES if present[p[0]] >= present[p[1]] >= present[p[2]]])
+    for order in stack_orders:
+        for parts in product(*(inner[s] for s in order)):
+            yield parts[0] + parts[1] + parts[2]
+
+def _row_key(src_row, cols, relabel, next_label):
+    # Row as it would read in canonical form; empties sort after every digit
+    key = []; relabel = relabel[:]
+    for c in cols:
+        v = src_row[c]
+        if not v: key.append(EMPTY_KEY); continue
+        if not relabel[v]: relabel[v] = next_label; next_label += 1
+        key.append(relabel[v])
+    return tuple(key), relabel, next_label
+
+def canonicalize(grid):
+    # Lexicographically smallest image of grid, built one row at a time while
+    # keeping every partial transform that ties for the smallest prefix.
+    # Returns (canonical grid, Transform).
+    sources = [grid, _transposed(grid)]
+    most = max(sum(1 for v in row if v) for src in sources for row in src)
+    states = []
+    for t, src in enumerate(sources):
+        for r, row in enumerate(src):
+            if sum(1 for v in row if v) != most: continue
+            for cols in _first_row_columns(row):
+                _, relabel, next_label = _row_key(row, cols, [0] * (GRID_SIZE + 1), 1)
+                states.append((t, [r], cols, relabel, next_label))
+    for k in range(1, GRID_SIZE):
+        best = None; kept = []
+        for t, rows, cols, relabel, next_label in states:
+            if k % 3: options = [r for r in range(rows[-1] // 3 * 3, rows[-1] // 3 * 3 + 3) if r not in rows]
+            else:
+                used = {r // 3 for r in rows}
+                options = [r for b in range(3) if b not in used for r in range(3 * b, 3 * b + 3)]
+            for r in options:
+                key, new_relabel, new_next = _row_key(sources[t][r], cols, relabel, next_label)
+                if best is None or key < best: best = key; kept = []
+                if key == best: kept.append((t, rows + [r], cols, new_relabel, new_next))
+        states = kept
+    t, rows, cols, relabel, next_label = states[0]
+    # Digits missing from the grid take the remaining labels in order
+    for d in range(1, GRID_SIZE + 1):
+        if not relabel[d]: relabel[d] = next_label; next_label += 1
+    transform = Transform(bool(t), tuple(rows), tuple(cols), tuple(relabel))
+    return apply_transform(grid, transform), transform
+
+def apply_transform(grid, tf):
+    src = _transposed(grid) if tf.transpose else grid
+    return [[tf.relabel[src[r][c]] for c in tf.cols] for r in tf.rows]
+
+def invert_transform(grid, tf):
+    # Maps a grid in canonical coordinates (e.g. a cached solution) back
+    inverse = [0] * (GRID_SIZE + 1)
+    for d, label in enumerate(tf.relabel): inverse[label] = d
+    src = [[0] * GRID_SIZE for _ in range(GRID_SIZE)]
+    for i, r in enumerate(tf.rows):
+        for j, c in enumerate(tf.cols): src[r][c] = inverse[grid[i][j]]
+    return _transposed(src) if tf.transpose else src
+
+def _bypass(grid):
+    # Grids the cache skips: sizes other than 9x9, grids with too few clues to
+    # be unique (near-empty ones take seconds to canonicalize) and full grids
+    # (slow to canonicalize, instant to check)
+    if len(grid) != GRID_SIZE: return True
+    clues = sum(1 for row in grid for v in row if v)
+    return clues < MIN_UNIQUE_CLUES or clues == GRID_SIZE * GRID_SIZE
+
+class PuzzleCache:
+    # Entries are JSON-able dicts keyed by the canonical 81-character string:
+    # "solution"/"count" from the uniqueness check plus any results stored via
+    # cached(). The newest maxsize entries stay in memory; with a path, entries
+    # also go to an SQLite file that several processes can share.
+    def __init__(self, maxsize=4096, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        self._db_pid = None
+
+    def _conn(self):
+        # One connection per process: pool workers fork with the parent's cache
+        if self.path is None: return None
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, entry TEXT)")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            return entry
+        db = self._conn()
+        row = db.execute("SELECT entry FROM cache WHERE key = ?", (key,)).fetchone() if db else None
+        if row is None: return None
+        entry = json.loads(row[0])
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        db = self._conn()
+        if db:
+            with db: db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?)", (key, json.dumps(entry)))
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.maxsize: self.memory.popitem(last=False)
+
+    def _field(self, key, grid, field, compute):
+        # Entry under key, with field filled in by compute(grid) on a miss
+        entry = self.get(key) or {}
+        if field in entry: self.hits += 1
+        else:
+            self.misses += 1
+            entry = dict(entry, **compute(grid))
+            self.put(key, entry)
+        return entry
+
+    def solve_unique(self, grid, solve=dlx.solve_unique):
+        # Same contract as dlx.solve_unique, which solve (called on a miss)
+        # must follow. Keyed on the canonical form, so every copy of a puzzle
+        # under the symmetry group shares one search.
+        if _bypass(grid): return solve(grid)
+        def compute(canonical):
+            sol, count = solve(canonical)
+            return {"solution": format_grid(sol) if sol else None, "count": count}
+        canonical, tf = canonicalize(grid)
+        entry = self._field(format_grid(canonical), canonical, "count", compute)
+        sol = entry["solution"]
+        return (invert_transform(parse_grid(sol), tf) if sol else None), entry["count"]
+
+    def cached(self, grid, field, compute):
+        # Result of compute(grid) stored under field, keyed on the grid as
+        # given: results such as ratings depend on its orientation and labels,
+        # so copies do not share them. Every key is a literal grid, so these
+        # fields and solve_unique's describe the same puzzle when keys meet.
+        return self._field(format_grid(grid), grid, field, lambda g: {field: compute(g)})[field]
@@ -0,0 +1,160 @@
+# Dancing Links (Algorithm X) exact-cover search for Sudoku of any N x N
+# grid with N = box**2; the size is read off the grid
+from math import isqrt
+
+class SearchAborted(Exception):
+    pass
+
+class ExactCover:
+    # Header 0 is the root, headers 1..ncols are columns; every other index is a
+    # matrix node. Links live in flat lists so cover/uncover is plain indexing.
+    def __init__(self, ncols):
+        n = ncols + 1
+        self.L = [i - 1 for i in range(n)]; self.L[0] = ncols
+        self.R = [(i + 1) % n for i in range(n)]
+        self.U = list(range(n))
+        self.D = list(range(n))
+        self.C = list(range(n))
+        self.S = [0] * n
+        self.row_of = [-1] * n
+        self.nodes = 0
+        # The search raises SearchAborted once nodes passes this; another
+        # thread can lower it to 0 to cancel a running search
+        self.max_nodes = float('inf')
+
+    def add_row(self, row_id, cols):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        first = len(C)
+        for c in cols:
+            x = len(C)
+            C.append(c); self.row_of.append(row_id)
+            U.append(U[c]); D.append(c)
+            D[U[c]] = x; U[c] = x
+            S[c] += 1
+            L.append(x - 1); R.append(x + 1)
+        last = len(C) - 1
+        L[first] = last; R[last] = first
+
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        L[R[c]] = L[c]; R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]; U[D[j]] = U[j]; S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1; D[U[j]] = j; U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c; R[L[c]] = c
+
+    def solutions(self):
+        # Yields the row ids of each exact cover, choosing the column with the
+        # fewest remaining rows at every level.
+        L, R, D, C, S, row_of = self.L, self.R, self.D, self.C, self.S, self.row_of
+        chosen = []
+        def search():
+            self.nodes += 1
+            if self.nodes > self.max_nodes: raise SearchAborted(self.nodes)
+            c = R[0]
+            if c == 0:
+                yield list(chosen); return
+            best = c; size = S[c]
+            c = R[c]
+            while c and size > 1:
+                if S[c] < size: best = c; size = S[c]
+                c = R[c]
+            if size == 0: return
+            self.cover(best)
+            r = D[best]
+            while r != best:
+                chosen.append(row_of[r])
+                j = R[r]
+                while j != r: self.cover(C[j]); j = R[j]
+                yield from search()
+                j = L[r]
+                while j != r: self.uncover(C[j]); j = L[j]
+                chosen.pop()
+                r = D[r]
+            self.uncover(best)
+        return search()
+
+def _columns(r, c, k, n, box):
+    b = (r // box) * box + c // box
+    return (r * n + c, n * n + r * n + k, 2 * n * n + c * n + k, 3 * n * n + b * n + k)
+
+def build_matrix(grid):
+    # Givens are taken out up front; returns (matrix, values) or None when the
+    # givens already clash with each other.
+    n = len(grid); box = isqrt(n)
+    done = [False] * (4 * n * n)
+    values = [0] * (n * n)
+    for r in range(n):
+        for c in range(n):
+            d = grid[r][c]
+            if d == 0: continue
+            cols = _columns(r, c, d - 1, n, box)
+            if any(done[x] for x in cols): return None
+            for x in cols: done[x] = True
+            values[r * n + c] = d
+    header = {}
+    for x in range(4 * n * n):
+        if not done[x]: header[x] = len(header) + 1
+    ec = ExactCover(len(header))
+    for r in range(n):
+        for c in range(n):
+            if values[r * n + c]: continue
+            for k in range(n):
+                cols = _columns(r, c, k, n, box)
+                if any(done[x] for x in cols): continue
+                ec.add_row((r * n + c) * n + k, [header[x] for x in cols])
+    return ec, values
+
+def _to_grid(values, rows):
+    values = list(values); n = isqrt(len(values))
+    for row_id in rows:
+        cell, k = divmod(row_id, n)
+        values[cell] = k + 1
+    return [values[r * n:(r + 1) * n] for r in range(n)]
+
+def solve(grid):
+    built = build_matrix(grid)
+    if built is None: return None
+    ec, values = built
+    for rows in ec.solutions(): return _to_grid(values, rows)
+    return None
+
+def count_solutions(grid, limit=2):
+    built = build_matrix(grid)
+    if built is None: return 0
+    count = 0
+    for _ in built[0].solutions():
+        count += 1
+        if count >= limit: break
+    return count
+
+def solve_unique(grid):
+    # One search that stops at the second solution: (solution, count) with
+    # count 0 (unsolvable), 1 (unique) or 2 (multiple; solution is the first found).
+    built = build_matrix(grid)
+    if built is None: return None, 0
+    return unique_search(*built)
+
+def unique_search(ec, values):
+    # solve_unique on an already built matrix, for callers that watch ec.nodes
+    # or cancel through ec.max_nodes
+    first = None; count = 0
+    for rows in ec.solutions():
+        count += 1
+        if first is None: first = _to_grid(values, rows)
+        if count == 2: break
+    return first, count
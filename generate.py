@@ -0,0 +1,162 @@
+# Puzzle generator: a random solved grid, then clues taken out (in symmetric
+# groups) for as long as the DLX count still finds exactly one solution.
+# Usage: python generate.py -n 1000 [--seed 0] [--clues 26] [--symmetry rot180]
+#        [--difficulty medium] [--workers 8] [--out puzzles.txt]
+#        python generate.py --minimize puzzles.txt [--order random|rows|reverse] [--seed 0]
+import argparse
+import multiprocessing
+import random
+import sys
+import dlx
+from rate import DIFFICULTIES, WINDOW_CHUNKS, grade, puzzle_lines, windows
+from solver import GRID_SIZE, SolverState, format_grid, iter_solutions, other_solution, parse_grid
+
+MAX_ATTEMPTS = 1000
+
+def _orbits(image):
+    seen = set(); orbits = []
+    for r in range(GRID_SIZE):
+        for c in range(GRID_SIZE):
+            if (r, c) in seen: continue
+            orbit = sorted(set(image(r, c)))
+            seen.update(orbit)
+            orbits.append(orbit)
+    return orbits
+
+_E = GRID_SIZE - 1
+# Cells that are emptied together under each symmetry
+SYMMETRIES = {
+    "none": _orbits(lambda r, c: [(r, c)]),
+    "rot180": _orbits(lambda r, c: [(r, c), (_E - r, _E - c)]),
+    "rot90": _orbits(lambda r, c: [(r, c), (c, _E - r), (_E - r, _E - c), (_E - c, r)]),
+    "mirror": _orbits(lambda r, c: [(r, c), (r, _E - c)]),
+    "diagonal": _orbits(lambda r, c: [(r, c), (c, r)]),
+}
+
+def random_solution(rng):
+    # The three diagonal boxes are independent, so fill them with random
+    # permutations and let DLX complete the grid
+    grid = [[0] * GRID_SIZE for _ in range(GRID_SIZE)]
+    for b in (0, 4, 8):
+        for n, d in enumerate(rng.sample(range(1, GRID_SIZE + 1), GRID_SIZE)):
+            grid[(b // 3) * 3 + n // 3][(b % 3) * 3 + n % 3] = d
+    return dlx.solve(grid)
+
+def reduce(solution, rng, symmetry="none", clues=None):
+    # Empties symmetric cell groups in random order, keeping each removal only
+    # if the puzzle stays unique. Stops early once at most `clues` remain.
+    orbits = SYMMETRIES[symmetry][:]
+    rng.shuffle(orbits)
+    st = SolverState(solution); flat = st.values[:]
+    count = GRID_SIZE * GRID_SIZE
+    for orbit in orbits:
+        if clues is not None and count <= clues: break
+        cells = [r * GRID_SIZE + c for r, c in orbit]
+        for i in cells: st.remove(i)
+        if other_solution(st, cells, flat):
+            for i in cells: st.place(i, flat[i])
+        else: count -= len(orbit)
+    return st.grid(), count
+
+# Order in which minimize tries the clues (flat cell indexes)
+ORDERS = {
+    "random": lambda clues, rng: rng.sample(clues, len(clues)),
+    "rows": lambda clues, rng: clues,
+    "reverse": lambda clues, rng: clues[::-1],
+}
+
+def minimize(puzzle, order="random", rng=None):
+    # Minimal clue subset of a puzzle with a unique solution: each clue is
+    # taken out, in `order`, unless that lets a second solution in. One pass
+    # suffices, since a clue that had to stay is still needed once others go.
+    # A single SolverState follows the removals, and each check only searches
+    # for a solution with another digit in the freed cell.
+    st = SolverState(puzzle)
+    solutions = list(iter_solutions(puzzle, 2))
+    if len(solutions) != 1: raise ValueError("puzzle must have exactly one solution")
+    flat = [v for row in solutions[0] for v in row]
+    clues = [i for i, v in enumerate(st.values) if v]
+    for i in ORDERS[order](clues, rng or random.Random()) if isinstance(order, str) else order:
+        st.remove(i)
+        if other_solution(st, [i], flat): st.place(i, flat[i])
+    return st.grid()
+
+def generate_one(seed, clues=None, symmetry="none", difficulty=None):
+    # (puzzle, solution) with a unique solution; the same seed and options
+    # always give the same puzzle
+    rng = random.Random(seed)
+    for _ in range(MAX_ATTEMPTS):
+        solution = random_solution(rng)
+        puzzle, count = reduce(solution, rng, symmetry, clues)
+        if clues is not None and count > clues: continue
+        if difficulty is not None and grade(puzzle) != difficulty: continue
+        return puzzle, solution
+    raise RuntimeError(f"no puzzle matching clues={clues} difficulty={difficulty} after {MAX_ATTEMPTS} attempts (seed {seed})")
+
+def _worker(task):
+    seed, opts = task
+    puzzle, solution = generate_one(seed, **opts)
+    return format_grid(puzzle), format_grid(solution)
+
+def generate_many(n, seed=0, workers=None, ordered=True, **opts):
+    # Yields (puzzle, solution) lines. Puzzle k comes from seed + k, so the
+    # output does not depend on the number of workers.
+    tasks = ((seed + k, opts) for k in range(n))
+    if workers == 1:
+        yield from map(_worker, tasks)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from (pool.imap if ordered else pool.imap_unordered)(_worker, tasks, chunksize=4)
+
+# Puzzles per task sent to a worker by minimize_many
+MINIMIZE_CHUNKSIZE = 16
+
+def _minimize_line(task):
+    k, line, order, seed = task
+    try: return format_grid(minimize(parse_grid(line), order, random.Random(seed + k)))
+    except ValueError as e: return f"# {line}: {e}"
+
+def minimize_many(lines, order="random", seed=0, workers=None):
+    # Yields the minimized puzzle lines in input order (a "# " comment for
+    # lines that are malformed or not unique); line k is shuffled with seed + k
+    tasks = ((k, line, order, seed) for k, line in enumerate(puzzle_lines(lines)))
+    if workers == 1:
+        yield from map(_minimize_line, tasks)
+        return
+    workers = workers or multiprocessing.cpu_count()
+    with multiprocessing.Pool(workers) as pool:
+        for window in windows(tasks, workers * MINIMIZE_CHUNKSIZE * WINDOW_CHUNKS):
+            yield from pool.imap(_minimize_line, window, MINIMIZE_CHUNKSIZE)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate puzzles with a unique solution.")
+    ap.add_argument("-n", type=int, default=1, help="number of puzzles")
+    ap.add_argument("--seed", type=int, default=0, help="seed of the first puzzle")
+    ap.add_argument("--clues", type=int, help="stop removing once at most this many clues remain")
+    ap.add_argument("--symmetry", choices=list(SYMMETRIES), default="none")
+    ap.add_argument("--difficulty", choices=DIFFICULTIES, help="hardest technique tier the puzzle must need")
+    ap.add_argument("--workers", type=int, help="processes (default: all cores)")
+    ap.add_argument("--unordered", action="store_true", help="write puzzles as they finish instead of in seed order")
+    ap.add_argument("--solutions", action="store_true", help="append the solution after each puzzle")
+    ap.add_argument("--minimize", metavar="PATH", help="instead of generating, reduce the puzzles of PATH (- for stdin) to minimal clue sets")
+    ap.add_argument("--order", choices=list(ORDERS), default="random", help="order in which --minimize tries the clues")
+    ap.add_argument("--out", help="output file (default stdout)")
+    args = ap.parse_args(argv)
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        if args.minimize:
+            src = sys.stdin if args.minimize == "-" else open(args.minimize)
+            with src:
+                for line in minimize_many(src, args.order, args.seed, args.workers): out.write(line + "\n")
+            return 0
+        for puzzle, solution in generate_many(args.n, args.seed, args.workers, not args.unordered, clues=args.clues,
+                                              symmetry=args.symmetry, difficulty=args.difficulty):
+            out.write(f"{puzzle} {solution}\n" if args.solutions else puzzle + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout: out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
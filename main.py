@@ -1,7 +1,15 @@
 import pygame
 import sys
 import textwrap
+import threading
+import time
+from collections import deque
+import dlx
+import stats
 from pygame.locals import *
+from canon import PuzzleCache
+from solver import GRID_SIZE, BOX_SIZE, GIVEN, CORRECT, Board, SolverState, box_size, geometry, CHAIN_TIME_BUDGET
+from steps import iter_steps, apply_step
 
 # Constants
 BASE_WIDTH = 600
@@ -9,15 +17,18 @@ WIDTH_SCALE = 1.15
 LOG_PANEL_WIDTH = 200
 WINDOW_WIDTH = int(BASE_WIDTH * WIDTH_SCALE) + LOG_PANEL_WIDTH
 WINDOW_HEIGHT = 700
-GRID_SIZE = 9
-CELL_SIZE = 540 // GRID_SIZE
-GRID_ORIGIN = ((WINDOW_WIDTH - LOG_PANEL_WIDTH - CELL_SIZE * GRID_SIZE) // 2, 30)
+GRID_PIXELS = 540
+GRID_ORIGIN = ((WINDOW_WIDTH - LOG_PANEL_WIDTH - GRID_PIXELS) // 2, 30)
 BUTTON_HEIGHT = 40
 BUTTON_WIDTH = 100
 BUTTON_MARGIN = 10
-BUTTON_Y = GRID_ORIGIN[1] + GRID_SIZE * CELL_SIZE + 20
+BUTTON_Y = GRID_ORIGIN[1] + GRID_PIXELS + 20
 FONT_SIZE = 30
 NOTE_FONT_SIZE = 18
+# Board sizes the Size button cycles through; notes are only drawn while a
+# note still gets MIN_NOTE_PIXELS
+SIZES = [9, 16, 25, 4]
+MIN_NOTE_PIXELS = 8
 POPUP_PADDING = 20
 HIGHLIGHT_COLOR = (200, 200, 255)
 SAME_NUM_HIGHLIGHT = (200, 255, 200)
@@ -35,34 +46,40 @@ LOG_BG = (240, 240, 240)
 LOG_TEXT_COLOR = BLACK
 
 BUTTONS = ["Lock/Unlock", "Solve", "Next", "Note", "Clear All"]
+# The Size button sits under the right end of the button row and shows the current size
+SIZE_BUTTON_WIDTH = 140
 MAX_LOG_ENTRIES = 6
 
-pygame.init()
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Sudoku Solver")
-font = pygame.font.SysFont(None, FONT_SIZE)
-note_font = pygame.font.SysFont(None, NOTE_FONT_SIZE)
-
-# Board cell representation
-def make_empty_board():
-    board = []
-    for r in range(GRID_SIZE):
-        row = []
-        for c in range(GRID_SIZE):
-            row.append({
-                'value': 0,
-                'given': False,
-                'notes': set(),
-                'correct': None
-            })
-        board.append(row)
-    return board
-
-board = make_empty_board()
+# Display and fonts are created in main() so importing this module has no side effects
+screen = None
+font = None
+note_font = None
+# Fonts for cell digits and notes, scaled to the current cell size
+cell_font = None
+cell_note_font = None
+
+# Board size N (N x N cells of box x box boxes) and the cell size in pixels
+size = GRID_SIZE
+box = BOX_SIZE
+cell_size = GRID_PIXELS // size
+board = Board()
 locked = False
 note_mode = False
 selected = (0, 0)
 solution = None
+# Uniqueness checks keyed on the canonical form, so re-locking a puzzle (or a
+# rotated / relabelled copy) is instant
+puzzle_cache = PuzzleCache()
+# Candidate masks / pencil marks of the locked puzzle, kept up to date incrementally
+state = None
+# Solve path precomputed in the background after Lock; None while it is being
+# computed or once a manual edit has made it stale
+trace = None
+trace_id = 0
+# Uniqueness check started by Lock, running on a worker thread:
+# {"grid", "ec" (its DLX matrix, for progress), "result", "aborted"}; None when idle
+solve_job = None
+SOLVE_TIMEOUT_MS = 10000
 start_ticks = None
 elapsed_time = None
 popup_text = ""
@@ -70,8 +87,12 @@ popup_buttons = []
 popup_active = False
 popup_clicks = []
 notes_initialized = False
+# Digits typed so far for a value that takes two keys (boards above 9x9)
+entry = ""
 # Log entries fixed size
 log_entries = []
+# Stats overlay over the bottom of the log panel, toggled with F3
+show_stats = False
 
 # Button rectangles
 def make_button_rects():
@@ -81,316 +102,227 @@ def make_button_rects():
         if label == "Lock/Unlock": widths.append(140)
         else: widths.append(BUTTON_WIDTH)
     total_width = sum(widths) + (len(BUTTONS) - 1) * BUTTON_MARGIN
-    start_x = GRID_ORIGIN[0] + (CELL_SIZE * GRID_SIZE - total_width) // 2
+    start_x = GRID_ORIGIN[0] + (GRID_PIXELS - total_width) // 2
     x = start_x
     for i, label in enumerate(BUTTONS):
         w = widths[i]
         rect = pygame.Rect(x, BUTTON_Y, w, BUTTON_HEIGHT)
         rects.append((rect, label))
         x += w + BUTTON_MARGIN
+    rects.append((pygame.Rect(x - BUTTON_MARGIN - SIZE_BUTTON_WIDTH, BUTTON_Y + BUTTON_HEIGHT + BUTTON_MARGIN,
+                              SIZE_BUTTON_WIDTH, BUTTON_HEIGHT), "Size"))
     return rects
 
 button_rects = make_button_rects()
 
-# Solver utilities
-def find_empty(bd):
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            if bd[i][j] == 0: return i, j
-    return None
-
-def valid(bd, num, pos):
-    r, c = pos
-    for j in range(GRID_SIZE):
-        if bd[r][j] == num and j != c: return False
-    for i in range(GRID_SIZE):
-        if bd[i][c] == num and i != r: return False
-    box_x = (c // 3) * 3
-    box_y = (r // 3) * 3
-    for i in range(box_y, box_y + 3):
-        for j in range(box_x, box_x + 3):
-            if bd[i][j] == num and (i, j) != pos: return False
-    return True
-
-def solve_backtrack(bd):
-    empty = find_empty(bd)
-    if not empty: return True
-    r, c = empty
-    for num in range(1, 10):
-        if valid(bd, num, (r, c)):
-            bd[r][c] = num
-            if solve_backtrack(bd): return True
-            bd[r][c] = 0
-    return False
-
-def board_solvable(bd):
-    given_count = sum(1 for i in range(GRID_SIZE) for j in range(GRID_SIZE) if bd[i][j] != 0)
-    if given_count < 17: return False
-    temp = [[bd[i][j] for j in range(GRID_SIZE)] for i in range(GRID_SIZE)]
-    return solve_backtrack(temp)
-
-def compute_solution(bd):
-    temp = [[bd[i][j] for j in range(GRID_SIZE)] for i in range(GRID_SIZE)]
-    if solve_backtrack(temp): return temp
-    return None
-
-def get_candidates(bd, r, c):
-    if bd[r][c] != 0: return []
-    candidates = set(range(1, 10))
-    for j in range(GRID_SIZE):
-        if bd[r][j] in candidates: candidates.remove(bd[r][j])
-    for i in range(GRID_SIZE):
-        if bd[i][c] in candidates: candidates.remove(bd[i][c])
-    box_x = (c // 3) * 3
-    box_y = (r // 3) * 3
-    for i in range(box_y, box_y + 3):
-        for j in range(box_x, box_x + 3):
-            if bd[i][j] in candidates: candidates.discard(bd[i][j])
-    return sorted(candidates)
-
-# Techniques
-def find_hidden_single(bd):
-    for i in range(GRID_SIZE):
-        empties = [j for j in range(GRID_SIZE) if bd[i][j] == 0]
-        if not empties: continue
-        cand_map = {j: get_candidates(bd, i, j) for j in empties}
-        for val in range(1, 10):
-            positions = [j for j in empties if val in cand_map[j]]
-            if len(positions) == 1:
-                j = positions[0]
-                explanation = f"Row {i+1} only cell ({i+1},{j+1}) can be {val}."
-                return i, j, val, explanation
-    for j in range(GRID_SIZE):
-        empties = [i for i in range(GRID_SIZE) if bd[i][j] == 0]
-        if not empties: continue
-        cand_map = {i: get_candidates(bd, i, j) for i in empties}
-        for val in range(1, 10):
-            positions = [i for i in empties if val in cand_map[i]]
-            if len(positions) == 1:
-                i = positions[0]
-                explanation = f"Column {j+1} only cell ({i+1},{j+1}) can be {val}."
-                return i, j, val, explanation
-    for box_row in range(3):
-        for box_col in range(3):
-            cells = []
-            for di in range(3):
-                for dj in range(3):
-                    i = box_row*3 + di; j = box_col*3 + dj
-                    if bd[i][j] == 0: cells.append((i,j))
-            if not cells: continue
-            cand_map = {(i,j): get_candidates(bd, i, j) for (i,j) in cells}
-            for val in range(1, 10):
-                positions = [(i,j) for (i,j) in cells if val in cand_map[(i,j)]]
-                if len(positions) == 1:
-                    i,j = positions[0]
-                    explanation = f"Box centered at ({box_row*3+2},{box_col*3+2}) only cell ({i+1},{j+1}) can be {val}."
-                    return i, j, val, explanation
-    return None
-
-def find_naked_pair():
-    for i in range(GRID_SIZE):
-        empties = [(i,j) for j in range(GRID_SIZE) if board[i][j]['value']==0]
-        pairs = {}
-        for (r,c) in empties:
-            notes = board[r][c]['notes']
-            if len(notes)==2:
-                key = frozenset(notes)
-                pairs.setdefault(key, []).append((r,c))
-        for key, cells in pairs.items():
-            if len(cells)==2:
-                affected = []
-                for j in range(GRID_SIZE):
-                    if (i,j) not in cells and board[i][j]['value']==0 and board[i][j]['notes'] & key:
-                        affected.append((i,j))
-                if affected:
-                    explanation = f"Naked pair {set(key)} in row {i+1}, remove from other cells."
-                    return ('row', i, key, affected, explanation)
-    for j in range(GRID_SIZE):
-        empties = [(i,j) for i in range(GRID_SIZE) if board[i][j]['value']==0]
-        pairs = {}
-        for (r,c) in empties:
-            notes = board[r][c]['notes']
-            if len(notes)==2:
-                key = frozenset(notes)
-                pairs.setdefault(key, []).append((r,c))
-        for key, cells in pairs.items():
-            if len(cells)==2:
-                affected = []
-                for i in range(GRID_SIZE):
-                    if (i,j) not in cells and board[i][j]['value']==0 and board[i][j]['notes'] & key:
-                        affected.append((i,j))
-                if affected:
-                    explanation = f"Naked pair {set(key)} in column {j+1}, remove from other cells."
-                    return ('col', j, key, affected, explanation)
-    for box_row in range(3):
-        for box_col in range(3):
-            cells = []
-            for di in range(3):
-                for dj in range(3):
-                    i = box_row*3+di; j = box_col*3+dj
-                    if board[i][j]['value']==0: cells.append((i,j))
-            pairs = {}
-            for (r,c) in cells:
-                notes = board[r][c]['notes']
-                if len(notes)==2:
-                    key = frozenset(notes)
-                    pairs.setdefault(key, []).append((r,c))
-            for key, pcells in pairs.items():
-                if len(pcells)==2:
-                    affected = []
-                    for (i,j) in cells:
-                        if (i,j) not in pcells and board[i][j]['value']==0 and board[i][j]['notes'] & key:
-                            affected.append((i,j))
-                    if affected:
-                        explanation = f"Naked pair {set(key)} in box centered at ({box_row*3+2},{box_col*3+2}), remove from other cells."
-                        return ('box', (box_row,box_col), key, affected, explanation)
-    return None
-
-def find_naked_trio():
-    from itertools import combinations
-    for i in range(GRID_SIZE):
-        empties = [(i,j) for j in range(GRID_SIZE) if board[i][j]['value']==0 and board[i][j]['notes']]
-        for combo in combinations(empties, 3):
-            union = set().union(*(board[r][c]['notes'] for r,c in combo))
-            if len(union) == 3:
-                affected = []
-                for j in range(GRID_SIZE):
-                    if (i,j) not in combo and board[i][j]['value']==0 and board[i][j]['notes'] & union:
-                        affected.append((i,j))
-                if affected:
-                    explanation = f"Naked trio {union} in row {i+1}, remove from other cells."
-                    return ('row', i, union, affected, explanation)
-    for j in range(GRID_SIZE):
-        empties = [(i,j) for i in range(GRID_SIZE) if board[i][j]['value']==0 and board[i][j]['notes']]
-        for combo in combinations(empties, 3):
-            union = set().union(*(board[r][c]['notes'] for r,c in combo))
-            if len(union) == 3:
-                affected = []
-                for i in range(GRID_SIZE):
-                    if (i,j) not in combo and board[i][j]['value']==0 and board[i][j]['notes'] & union:
-                        affected.append((i,j))
-                if affected:
-                    explanation = f"Naked trio {union} in column {j+1}, remove from other cells."
-                    return ('col', j, union, affected, explanation)
-    for box_row in range(3):
-        for box_col in range(3):
-            cells = []
-            for di in range(3):
-                for dj in range(3):
-                    i = box_row*3+di; j = box_col*3+dj
-                    if board[i][j]['value']==0 and board[i][j]['notes']:
-                        cells.append((i,j))
-            for combo in combinations(cells, 3):
-                union = set().union(*(board[r][c]['notes'] for r,c in combo))
-                if len(union) == 3:
-                    affected = []
-                    for (i,j) in cells:
-                        if (i,j) not in combo and board[i][j]['notes'] & union:
-                            affected.append((i,j))
-                    if affected:
-                        explanation = f"Naked trio {union} in box centered at ({box_row*3+2},{box_col*3+2}), remove from other cells."
-                        return ('box', (box_row,box_col), union, affected, explanation)
-    return None
-
-def find_single_note_correct():
-    if not solution: return None
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            if board[i][j]['value'] == 0 and len(board[i][j]['notes']) == 1:
-                val = next(iter(board[i][j]['notes']))
-                if solution[i][j] == val: return i, j, val
-    return None
+# Render caches: glyph surfaces by (font, text, color), the key each cell and
+# screen region was last drawn with (only changed ones are redrawn), the dark
+# popup overlay and the wrapped, rendered lines of each log entry.
+glyph_cache = {}
+cell_keys = [None] * (GRID_SIZE * GRID_SIZE)
+region_keys = {}
+overlay = None
+log_version = 0
+log_line_cache = {}
+TIMER_RECT = pygame.Rect(GRID_ORIGIN[0], GRID_ORIGIN[1] + GRID_PIXELS + BUTTON_HEIGHT + 40, 400, FONT_SIZE)
+LOG_RECT = pygame.Rect(GRID_ORIGIN[0] + GRID_PIXELS + 30, 10, LOG_PANEL_WIDTH - 20, WINDOW_HEIGHT - 20)
+STATS_RECT = pygame.Rect(LOG_RECT.x, LOG_RECT.bottom - 250, LOG_RECT.width, 250)
+
+def glyph(f, text, color):
+    # Keyed on the font itself: an id could be reused by a font made later
+    key = (f, text, color)
+    surf = glyph_cache.get(key)
+    if surf is None: surf = glyph_cache[key] = f.render(text, True, color)
+    return surf
+
+def build_glyphs():
+    # Digits, notes and labels are all known up front
+    for d in range(1, size + 1):
+        glyph(cell_font, str(d), BLACK); glyph(cell_font, str(d), BLUE); glyph(cell_note_font, str(d), GREY)
+    for label in BUTTONS + ["Log", "OK", "Yes", "No"]: glyph(font, label, BLACK)
+
+def make_cell_fonts():
+    global cell_font, cell_note_font
+    cell_font = pygame.font.SysFont(None, min(FONT_SIZE, cell_size * 4 // 5))
+    cell_note_font = pygame.font.SysFont(None, min(NOTE_FONT_SIZE, cell_size // box + 2))
+
+def invalidate():
+    # Forget what is on screen so the next frame redraws everything
+    region_keys.clear()
+    cell_keys[:] = [None] * (size * size)
 
 # Logging
 def append_log(msg):
-    global log_entries
+    global log_entries, log_version
     if len(log_entries) >= MAX_LOG_ENTRIES:
         log_entries.pop(0)
     log_entries.append(msg)
-
-# Draw grid with borders on top of highlights
+    log_version += 1
+
+def draw_cell_borders(r, c, x, y):
+    top = 4 if r % box == 0 else 1; bottom = 4 if (r + 1) % box == 0 else 1
+    left = 4 if c % box == 0 else 1; right = 4 if (c + 1) % box == 0 else 1
+    pygame.draw.line(screen, BLACK, (x, y), (x + cell_size, y), top)
+    pygame.draw.line(screen, BLACK, (x, y + cell_size), (x + cell_size, y + cell_size), bottom)
+    pygame.draw.line(screen, BLACK, (x, y), (x, y + cell_size), left)
+    pygame.draw.line(screen, BLACK, (x + cell_size, y), (x + cell_size, y + cell_size), right)
+
+# Draw grid with borders on top of highlights; only cells whose look changed
+# since the last frame are redrawn. Returns the screen rects touched.
 def draw_grid():
-    pygame.draw.rect(screen, WHITE, (GRID_ORIGIN[0], GRID_ORIGIN[1], CELL_SIZE*GRID_SIZE, CELL_SIZE*GRID_SIZE))
     sel_r, sel_c = selected
-    sel_cell_val = board[sel_r][sel_c]['value']
-    for r in range(GRID_SIZE):
-        for c in range(GRID_SIZE):
-            x = GRID_ORIGIN[0] + c * CELL_SIZE
-            y = GRID_ORIGIN[1] + r * CELL_SIZE
-            rect = pygame.Rect(x+1, y+1, CELL_SIZE-2, CELL_SIZE-2)
-            if (r, c) == (sel_r, sel_c): pygame.draw.rect(screen, HIGHLIGHT_COLOR, rect)
-            if sel_cell_val != 0 and (r, c) != (sel_r, sel_c):
-                if r == sel_r or c == sel_c or (r//3 == sel_r//3 and c//3 == sel_c//3): pygame.draw.rect(screen, HIGHLIGHT_COLOR, rect)
-                if sel_cell_val is not None and board[r][c]['value'] == sel_cell_val and (r,c) != (sel_r,sel_c): pygame.draw.rect(screen, SAME_NUM_HIGHLIGHT, rect)
-    for r in range(GRID_SIZE):
-        for c in range(GRID_SIZE):
-            cell = board[r][c]
-            x = GRID_ORIGIN[0] + c * CELL_SIZE
-            y = GRID_ORIGIN[1] + r * CELL_SIZE
-            if cell['value'] != 0:
-                text_color = BLACK if not locked or cell['given'] else BLUE
-                text = font.render(str(cell['value']), True, text_color)
-                text_rect = text.get_rect(center=(x + CELL_SIZE // 2, y + CELL_SIZE // 2))
-                screen.blit(text, text_rect)
+    values = board.values
+    sel_cell_val = values[sel_r * size + sel_c]
+    show_notes = cell_size // box >= MIN_NOTE_PIXELS
+    rects = []
+    for r in range(size):
+        for c in range(size):
+            i = r * size + c; value = values[i]
+            bg = WHITE
+            if (r, c) == (sel_r, sel_c): bg = HIGHLIGHT_COLOR
+            elif sel_cell_val != 0:
+                if r == sel_r or c == sel_c or (r//box == sel_r//box and c//box == sel_c//box): bg = HIGHLIGHT_COLOR
+                if value == sel_cell_val: bg = SAME_NUM_HIGHLIGHT
+            if entry and (r, c) == (sel_r, sel_c):
+                key = (bg, entry, GREY)
+            elif value != 0:
+                key = (bg, value, BLACK if not locked or board.flags[i] & GIVEN else BLUE)
             else:
-                notes = sorted(cell['notes'])
-                for n in notes:
-                    idx = n - 1; nr = idx // 3; nc = idx % 3
-                    sx = x + nc * CELL_SIZE / 3 + 3; sy = y + nr * CELL_SIZE / 3 + 3
-                    note_text = note_font.render(str(n), True, GREY)
-                    screen.blit(note_text, (sx, sy))
-    # Draw grid lines on top
-    for r in range(GRID_SIZE+1):
-        width = 4 if r % 3 == 0 else 1
-        pygame.draw.line(screen, BLACK,
-                         (GRID_ORIGIN[0], GRID_ORIGIN[1] + r * CELL_SIZE),
-                         (GRID_ORIGIN[0] + GRID_SIZE * CELL_SIZE, GRID_ORIGIN[1] + r * CELL_SIZE), width)
-    for c in range(GRID_SIZE+1):
-        width = 4 if c % 3 == 0 else 1
-        pygame.draw.line(screen, BLACK,
-                         (GRID_ORIGIN[0] + c * CELL_SIZE, GRID_ORIGIN[1]),
-                         (GRID_ORIGIN[0] + c * CELL_SIZE, GRID_ORIGIN[1] + GRID_SIZE * CELL_SIZE), width)
-    pygame.draw.rect(screen, BLACK, (GRID_ORIGIN[0] - 2, GRID_ORIGIN[1] - 2, CELL_SIZE * GRID_SIZE + 4, CELL_SIZE * GRID_SIZE + 4), 3)
+                key = (bg, 0, board.notes[i] if show_notes else 0)
+            if cell_keys[i] == key: continue
+            cell_keys[i] = key
+            x = GRID_ORIGIN[0] + c * cell_size
+            y = GRID_ORIGIN[1] + r * cell_size
+            pygame.draw.rect(screen, bg, (x+1, y+1, cell_size-2, cell_size-2))
+            if key[1] != 0:
+                text = glyph(cell_font, str(key[1]), key[2])
+                screen.blit(text, text.get_rect(center=(x + cell_size // 2, y + cell_size // 2)))
+            else:
+                for n in geometry(box).mask_digits[key[2]]:
+                    idx = n - 1; nr = idx // box; nc = idx % box
+                    sx = x + nc * cell_size / box + 2; sy = y + nr * cell_size / box + 2
+                    screen.blit(glyph(cell_note_font, str(n), GREY), (sx, sy))
+            draw_cell_borders(r, c, x, y)
+            rects.append(pygame.Rect(x - 2, y - 2, cell_size + 4, cell_size + 4))
+    if rects:
+        outer = pygame.Rect(GRID_ORIGIN[0] - 2, GRID_ORIGIN[1] - 2, cell_size * size + 4, cell_size * size + 4)
+        pygame.draw.rect(screen, BLACK, outer, 3)
+    return rects
 
 # Draw buttons
 def draw_buttons():
+    key = (locked, note_mode, size)
+    if region_keys.get('buttons') == key: return []
+    region_keys['buttons'] = key
     for rect, label in button_rects:
         if label == "Lock/Unlock": bg = BUTTON_GREEN if locked else BUTTON_RED
         elif label == "Note": bg = BUTTON_GREEN if note_mode else BUTTON_RED
         else: bg = LIGHT_BLUE
         pygame.draw.rect(screen, bg, rect)
         pygame.draw.rect(screen, BLACK, rect, 2)
-        text = font.render(label, True, BLACK)
-        text_rect = text.get_rect(center=rect.center)
-        screen.blit(text, text_rect)
+        text = glyph(font, f"Size {size}x{size}" if label == "Size" else label, BLACK)
+        screen.blit(text, text.get_rect(center=rect.center))
+    return [rect for rect, _ in button_rects]
 
 # Draw timer
 def draw_timer():
-    if start_ticks is not None or elapsed_time is not None:
+    text = None
+    if solve_job is not None:
+        ec = solve_job["ec"]
+        text = f"Solving... {ec.nodes if ec else 0:,} nodes"
+    elif start_ticks is not None or elapsed_time is not None:
         if elapsed_time is None and locked: elapsed = (pygame.time.get_ticks() - start_ticks) // 1000
         else: elapsed = elapsed_time
         mins = elapsed // 60; secs = elapsed % 60
-        timer_text = font.render(f"Time: {mins:02d}:{secs:02d}", True, BLACK)
-        screen.blit(timer_text, (GRID_ORIGIN[0], GRID_ORIGIN[1] + GRID_SIZE * CELL_SIZE + BUTTON_HEIGHT + 40))
+        text = f"Time: {mins:02d}:{secs:02d}"
+    if region_keys.get('timer', '') == text: return []
+    region_keys['timer'] = text
+    pygame.draw.rect(screen, WHITE, TIMER_RECT)
+    if text: screen.blit(font.render(text, True, BLACK), TIMER_RECT.topleft)
+    return [TIMER_RECT]
 
 # Draw log panel without scrolling
 def draw_log_panel():
-    panel_x = GRID_ORIGIN[0] + GRID_SIZE*CELL_SIZE + 30
-    panel_y = 10
-    panel_w = LOG_PANEL_WIDTH - 20
-    panel_h = WINDOW_HEIGHT - 20
-    pygame.draw.rect(screen, LOG_BG, (panel_x, panel_y, panel_w, panel_h))
-    title_surf = font.render("Log", True, BLACK)
-    screen.blit(title_surf, (panel_x + 5, panel_y + 5))
+    global log_line_cache
+    if region_keys.get('log') == log_version: return []
+    region_keys['log'] = log_version
+    panel_x, panel_y, panel_w, panel_h = LOG_RECT
+    pygame.draw.rect(screen, LOG_BG, LOG_RECT)
+    screen.blit(glyph(font, "Log", BLACK), (panel_x + 5, panel_y + 5))
     line_height = NOTE_FONT_SIZE + 4
     y = panel_y + 30
+    cache = {}
     for text in log_entries:
-        wrapped = textwrap.wrap(text, width=20)
-        for part in wrapped:
-            entry_surf = note_font.render(part, True, LOG_TEXT_COLOR)
-            screen.blit(entry_surf, (panel_x + 5, y))
+        surfs = cache[text] = log_line_cache.get(text) or [note_font.render(part, True, LOG_TEXT_COLOR) for part in textwrap.wrap(text, width=20)]
+        for surf in surfs:
+            if y > panel_y + panel_h - line_height: break
+            screen.blit(surf, (panel_x + 5, y))
             y += line_height
-            if y > panel_y + panel_h - line_height: return
+    log_line_cache = cache
+    return [LOG_RECT]
+
+def render_frame():
+    # Draws whatever changed since the last frame and returns the dirty rects
+    if popup_active:
+        key = (popup_text, bool(popup_buttons))
+        if region_keys.get('popup') == key: return []
+        if 'frame' not in region_keys: render_frame_base()
+        region_keys['popup'] = key
+        draw_popup()
+        return [screen.get_rect()]
+    if 'popup' in region_keys: invalidate()
+    return render_frame_base()
+
+def render_frame_base():
+    rects = []
+    if 'frame' not in region_keys:
+        screen.fill(WHITE); region_keys['frame'] = True
+        rects.append(screen.get_rect())
+    if stats.enabled: rects += draw_parts_timed()
+    else: rects += draw_grid(); rects += draw_buttons(); rects += draw_timer(); rects += draw_log_panel()
+    if show_stats: rects += draw_stats()
+    return rects
+
+def draw_parts_timed():
+    # render_frame_base's draw calls with per-frame timings for the stats
+    rects = []
+    for draw in (draw_grid, draw_buttons, draw_timer, draw_log_panel):
+        started = time.perf_counter()
+        rects += draw()
+        stats.add_time(draw.__name__, time.perf_counter() - started)
+    stats.count("frames")
+    return rects
+
+def stats_lines():
+    timings = stats.snapshot()["timings"]; counters = stats.counters
+    lines = [f"Stats, {counters['frames']} frames"]
+    for name in ("draw_grid", "draw_buttons", "draw_timer", "draw_log_panel"):
+        t = timings.get(name)
+        if t: lines.append(f"{name[5:]}: {t['mean_ms']:.2f} / {t['max_ms']:.2f} ms")
+    if "handle_next" in timings: lines.append(f"next: {timings['handle_next']['calls']} x {timings['handle_next']['mean_ms']:.2f} ms")
+    if "lock" in timings: lines.append(f"lock: {timings['lock']['max_ms']:.0f} ms, {counters['lock nodes']:,} nodes")
+    techniques = sorted((t for t in timings.items() if t[0].startswith("technique ")), key=lambda t: -t[1]["total_ms"])
+    for name, t in techniques[:4]: lines.append(f"{name[10:]}: {t['calls']} x {t['mean_ms']:.2f} ms")
+    return lines
+
+def draw_stats():
+    # Redrawn whenever its text or the log panel under it changes
+    lines = stats_lines()
+    key = (tuple(lines), log_version)
+    if region_keys.get('stats') == key: return []
+    region_keys['stats'] = key
+    pygame.draw.rect(screen, WHITE, STATS_RECT); pygame.draw.rect(screen, BLACK, STATS_RECT, 1)
+    line_height = NOTE_FONT_SIZE + 4
+    for n, line in enumerate(lines):
+        screen.blit(note_font.render(line, True, BLACK), (STATS_RECT.x + 5, STATS_RECT.y + 5 + n * line_height))
+    return [STATS_RECT]
+
+def toggle_stats():
+    # Showing the overlay turns recording on; hiding it leaves recording as is
+    global show_stats
+    show_stats = not show_stats
+    if show_stats: stats.enable()
+    region_keys.pop('log', None); region_keys.pop('stats', None)
 
 # Popup functions
 def show_message(text):
@@ -427,10 +359,13 @@ def draw_popup():
     btn_h = BUTTON_HEIGHT
     is_confirm = bool(popup_buttons and isinstance(popup_buttons[0], tuple))
     box_h = text_h + POPUP_PADDING*2 + btn_h + POPUP_PADDING
-    box_x = GRID_ORIGIN[0] + CELL_SIZE*GRID_SIZE - box_w - POPUP_PADDING
+    box_x = GRID_ORIGIN[0] + GRID_PIXELS - box_w - POPUP_PADDING
     box_y = (WINDOW_HEIGHT - box_h) // 2
-    overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180)); screen.blit(overlay, (0, 0))
+    global overlay
+    if overlay is None:
+        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))
+    screen.blit(overlay, (0, 0))
     pygame.draw.rect(screen, WHITE, (box_x, box_y, box_w, box_h)); pygame.draw.rect(screen, BLACK, (box_x, box_y, box_w, box_h), 2)
     for i, l in enumerate(lines):
         text_surf = font.render(l, True, BLACK)
@@ -444,40 +379,76 @@ def draw_popup():
         no_rect = pygame.Rect(start_x+btn_w+BUTTON_MARGIN, y, btn_w, btn_h)
         for rect, label, cb in [(yes_rect, "Yes", yes_cb), (no_rect, "No", no_cb)]:
             pygame.draw.rect(screen, LIGHT_BLUE, rect); pygame.draw.rect(screen, BLACK, rect, 2)
-            text_surf = font.render(label, True, BLACK); screen.blit(text_surf, text_surf.get_rect(center=rect.center))
+            text_surf = glyph(font, label, BLACK); screen.blit(text_surf, text_surf.get_rect(center=rect.center))
             popup_clicks.append((rect, label, cb))
     else:
         btn_w = 80; x = box_x + (box_w - btn_w)//2; y = box_y + POPUP_PADDING + text_h + POPUP_PADDING
         ok_rect = pygame.Rect(x, y, btn_w, btn_h)
         pygame.draw.rect(screen, LIGHT_BLUE, ok_rect); pygame.draw.rect(screen, BLACK, ok_rect, 2)
-        text_surf = font.render("OK", True, BLACK); screen.blit(text_surf, text_surf.get_rect(center=ok_rect.center))
+        text_surf = glyph(font, "OK", BLACK); screen.blit(text_surf, text_surf.get_rect(center=ok_rect.center))
         popup_clicks.append((ok_rect, "OK", close_popup))
 
 # Handlers
 def handle_lock_unlock():
-    global locked, solution, start_ticks, elapsed_time, notes_initialized
-    if not locked:
-        bd = [[board[i][j]['value'] for j in range(GRID_SIZE)] for i in range(GRID_SIZE)]
-        if not board_solvable(bd): show_message("Puzzle unsolvable! Check givens."); return
-        sol = compute_solution(bd)
-        if sol is None: show_message("Puzzle unsolvable! Check givens."); return
-        solution = sol; locked = True
-        for i in range(GRID_SIZE):
-            for j in range(GRID_SIZE):
-                if board[i][j]['value'] != 0: board[i][j]['given'] = True
-                board[i][j]['correct'] = None; board[i][j]['notes'].clear()
-        start_ticks = pygame.time.get_ticks(); elapsed_time = None; notes_initialized = False
-        append_log("Puzzle locked and solution computed.")
+    global locked, solution, state, start_ticks, elapsed_time, notes_initialized
+    if solve_job is not None: cancel_solve(); append_log("Solve cancelled."); return
+    if not locked: start_solve(board.grid())
     else:
-        locked = False
-        for i in range(GRID_SIZE):
-            for j in range(GRID_SIZE): board[i][j]['given'] = False; board[i][j]['correct'] = None; board[i][j]['notes'].clear()
-        solution = None; start_ticks = None; elapsed_time = None; notes_initialized = False
+        locked = False; drop_trace()
+        board.flags[:] = bytes(size * size)
+        solution = None; state = None; start_ticks = None; elapsed_time = None; notes_initialized = False
         append_log("Puzzle unlocked.")
 
+def start_solve(bd):
+    # The uniqueness check runs off the UI thread; SOLVE_EVENT brings the
+    # result back, SOLVE_TIMEOUT_EVENT gives up on it
+    global solve_job
+    job = solve_job = {"grid": bd, "ec": None, "result": None, "aborted": False, "started": time.perf_counter()}
+    def solve(grid):
+        built = dlx.build_matrix(grid)
+        if built is None: return None, 0
+        job["ec"] = built[0]
+        if job["aborted"]: raise dlx.SearchAborted(0)
+        return dlx.unique_search(*built)
+    def work():
+        try: job["result"] = puzzle_cache.solve_unique(bd, solve)
+        except dlx.SearchAborted: pass
+        post_event(SOLVE_EVENT, job=job)
+    threading.Thread(target=work, daemon=True).start()
+    pygame.time.set_timer(SOLVE_TIMEOUT_EVENT, SOLVE_TIMEOUT_MS, 1)
+    append_log("Solving...")
+
+def cancel_solve():
+    # Stops the worker's search; its late SOLVE_EVENT is then ignored
+    global solve_job
+    job = solve_job; solve_job = None
+    job["aborted"] = True
+    if job["ec"] is not None: job["ec"].max_nodes = 0
+    pygame.time.set_timer(SOLVE_TIMEOUT_EVENT, 0)
+
+def finish_solve(job):
+    global locked, solution, state, start_ticks, elapsed_time, notes_initialized, solve_job
+    if job is not solve_job: return
+    solve_job = None
+    pygame.time.set_timer(SOLVE_TIMEOUT_EVENT, 0)
+    if stats.enabled:
+        stats.add_time("lock", time.perf_counter() - job["started"])
+        stats.count("lock nodes", job["ec"].nodes if job["ec"] else 0)
+    sol, count = job["result"]
+    if count == 0: show_message("Puzzle unsolvable! Check givens."); return
+    if count > 1: show_message("Puzzle has multiple solutions! Add more givens."); return
+    bd = job["grid"]
+    solution = sol; state = SolverState(bd); locked = True; start_trace()
+    board.flags[:] = bytes(GIVEN if v else 0 for v in board.values)
+    start_ticks = pygame.time.get_ticks(); elapsed_time = None; notes_initialized = False
+    append_log("Puzzle locked and solution computed.")
+
 def ask_solve():
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE): board[i][j]['value'] = solution[i][j]; board[i][j]['correct'] = True
+    drop_trace()
+    for i in range(size * size):
+        d = solution[i // size][i % size]
+        if state.values[i] == 0: state.place(i, d)
+        board.values[i] = d; board.flags[i] |= CORRECT
     global start_ticks, elapsed_time
     if start_ticks is not None: elapsed_time = (pygame.time.get_ticks() - start_ticks) // 1000; start_ticks = None
     append_log("Puzzle solved via Solve.")
@@ -486,70 +457,50 @@ def handle_solve():
     if not locked: show_message("Lock the puzzle first to solve."); return
     confirm_action("Solve puzzle? No explanations will be given and it may ruin your experience.", ask_solve, lambda: close_popup())
 
-def remove_notes_on_fill(r, c, val):
-    for i in range(GRID_SIZE): board[i][c]['notes'].discard(val)
-    for j in range(GRID_SIZE): board[r][j]['notes'].discard(val)
-    br = (r//3)*3; bc = (c//3)*3
-    for di in range(3):
-        for dj in range(3): board[br+di][bc+dj]['notes'].discard(val)
+def start_trace():
+    # Walk the whole solve path on a snapshot so each Next is a pop
+    global trace, trace_id
+    trace = None; trace_id += 1
+    my_id = trace_id; snapshot = state.copy()
+    def work():
+        post_event(TRACE_EVENT, trace_id=my_id, steps=deque(iter_steps(snapshot, time_budget=CHAIN_TIME_BUDGET)))
+    threading.Thread(target=work, daemon=True).start()
+
+def finish_trace(event):
+    # Runs on the main thread; a trace dropped since it was started is ignored
+    global trace
+    if event.trace_id == trace_id: trace = event.steps
+
+def drop_trace():
+    global trace, trace_id
+    trace = None; trace_id += 1
 
 def handle_next():
-    global notes_initialized, elapsed_time, start_ticks, selected
-    if not locked: show_message("Lock the puzzle first to get next step."); return
-    bd = [[board[i][j]['value'] for j in range(GRID_SIZE)] for i in range(GRID_SIZE)]
-    # Naked single
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            if bd[i][j] == 0:
-                candidates = get_candidates(bd, i, j)
-                if len(candidates) == 1:
-                    val = candidates[0]
-                    board[i][j]['value'] = val; remove_notes_on_fill(i, j, val); selected = (i, j)
-                    append_log(f"Naked Single: Cell ({i+1},{j+1}) = {val}.")
-                    if start_ticks is not None and all(board[r][c]['value'] != 0 for r in range(GRID_SIZE) for c in range(GRID_SIZE)):
-                        elapsed_time = (pygame.time.get_ticks() - start_ticks) // 1000; start_ticks = None
-                    return
-    # Hidden single
-    hs = find_hidden_single(bd)
-    if hs:
-        i,j,val,explanation_text = hs
-        board[i][j]['value'] = val; remove_notes_on_fill(i, j, val); selected = (i, j)
-        append_log("Hidden Single: " + explanation_text)
-        if start_ticks is not None and all(board[r][c]['value'] != 0 for r in range(GRID_SIZE) for c in range(GRID_SIZE)):
-            elapsed_time = (pygame.time.get_ticks() - start_ticks) // 1000; start_ticks = None
-        return
-    # Initialize notes
-    if not notes_initialized:
-        for i in range(GRID_SIZE):
-            for j in range(GRID_SIZE):
-                if board[i][j]['value'] == 0: board[i][j]['notes'] = set(get_candidates(bd, i, j))
-        notes_initialized = True
-        append_log("Initialized notes with all candidates.")
-        return
-    # Single note fill
-    sn = find_single_note_correct()
-    if sn:
-        i,j,val = sn
-        board[i][j]['value'] = val; remove_notes_on_fill(i, j, val); selected = (i, j)
-        append_log(f"Single Note Fill: Cell ({i+1},{j+1}) = {val}.")
-        if start_ticks is not None and all(board[r][c]['value'] != 0 for r in range(GRID_SIZE) for c in range(GRID_SIZE)):
-            elapsed_time = (pygame.time.get_ticks() - start_ticks) // 1000; start_ticks = None
-        return
-    # Naked pair
-    np = find_naked_pair()
-    if np:
-        unit, idx, pair, affected, explanation_text = np
-        for (r,c) in affected: board[r][c]['notes'] -= pair
-        append_log("Naked Pair: " + explanation_text)
-        return
-    # Naked trio
-    nt = find_naked_trio()
-    if nt:
-        unit, idx, trio, affected, explanation_text = nt
-        for (r,c) in affected: board[r][c]['notes'] -= trio
-        append_log("Naked Trio: " + explanation_text)
-        return
-    append_log("No advanced technique found.")
+    if not stats.enabled: next_step(); return
+    started = time.perf_counter()
+    step = next_step()
+    stats.add_time("handle_next", time.perf_counter() - started)
+    if step: stats.count("next " + step.technique)
+
+def next_step():
+    # Shows and applies the next step; returns it, or None when there is none
+    global notes_initialized, elapsed_time, start_ticks, selected, entry
+    if not locked: show_message("Lock the puzzle first to get next step."); return None
+    if trace is not None:
+        step = trace.popleft() if trace else None
+        if step: apply_step(state, step)
+    else:
+        drop_trace()
+        step = next(iter_steps(state, notes_initialized, CHAIN_TIME_BUDGET), None)
+    if step is None: append_log("No advanced technique found."); return None
+    if step.technique == "Init Notes": notes_initialized = True
+    append_log(step.explanation)
+    if step.place is None: return step
+    cell, val = step.place; i, j = divmod(cell, size)
+    board.values[cell] = val; selected = (i, j); entry = ""
+    if start_ticks is not None and state.empty == 0:
+        elapsed_time = (pygame.time.get_ticks() - start_ticks) // 1000; start_ticks = None
+    return step
 
 def handle_note():
     global note_mode
@@ -557,61 +508,150 @@ def handle_note():
     if locked: append_log(f"Note mode {'ON' if note_mode else 'OFF'}")
 
 def clear_board():
-    global board
-    board = make_empty_board()
+    global board, entry
+    board = Board(size); entry = ""
+
+def set_size(n):
+    # Switches to an n x n board (cleared), rescaling cells and fonts
+    global size, box, cell_size, selected
+    size = n; box = box_size(n); cell_size = GRID_PIXELS // n; selected = (0, 0)
+    clear_board(); make_cell_fonts(); glyph_cache.clear(); build_glyphs(); invalidate()
+
+def handle_size():
+    if locked: show_message("Cannot change size while locked. Unlock first."); return
+    if solve_job is not None: show_message("Cannot change size while solving. Cancel first."); return
+    n = SIZES[(SIZES.index(size) + 1) % len(SIZES)]
+    def yes(): set_size(n); close_popup(); append_log(f"Switched to {n}x{n}.")
+    def no(): close_popup()
+    confirm_action(f"Switch to a {n}x{n} board? This clears all entries.", yes, no)
 
 def handle_clear_all():
     if locked: show_message("Cannot clear while locked. Unlock first."); return
+    if solve_job is not None: show_message("Cannot clear while solving. Cancel first."); return
     def yes(): clear_board(); close_popup(); append_log("Board cleared.")
     def no(): close_popup()
     confirm_action("Clear all entries? This CAN'T be undone.", yes, no)
 
-# Main loop
-clock = pygame.time.Clock()
-while True:
-    for event in pygame.event.get():
-        if event.type == QUIT: pygame.quit(); sys.exit()
-        if popup_active:
-            if event.type == MOUSEBUTTONDOWN:
-                pos = event.pos
-                for rect, label, callback in popup_clicks:
-                    if rect.collidepoint(pos): callback()
-            continue
+# Events
+TIMER_EVENT = pygame.USEREVENT + 1  # clock and solve progress ticks
+TRACE_EVENT = pygame.USEREVENT + 2  # posted by the trace worker, carries its id and steps
+SOLVE_EVENT = pygame.USEREVENT + 3  # posted by the Lock worker, carries its job
+SOLVE_TIMEOUT_EVENT = pygame.USEREVENT + 4  # one-shot, SOLVE_TIMEOUT_MS after Lock
+timer_running = 0
+
+def post_event(kind, **attrs):
+    # Worker threads wake the main loop this way; harmless before pygame is up
+    if pygame.display.get_init(): pygame.event.post(pygame.event.Event(kind, **attrs))
+
+def sync_timer():
+    # The only time-driven redraws are the clock and the solve progress, so
+    # tick (interval in ms, 0 for off) only while one of them is showing
+    global timer_running
+    if solve_job is not None: want = 250
+    else: want = 1000 if locked and start_ticks is not None and elapsed_time is None else 0
+    if want != timer_running:
+        pygame.time.set_timer(TIMER_EVENT, want)
+        timer_running = want
+
+def sync_notes():
+    # The board shows the solver's candidate masks once notes are initialized
+    board.set_notes(state.cand if state is not None and notes_initialized else None)
+
+def enter_value(r, c, num):
+    # A typed digit for the selected cell: free entry while unlocked, checked
+    # against the solution once locked
+    i = r * size + c
+    if not 1 <= num <= size: return
+    if not locked: board.values[i] = num
+    else:
+        if board.flags[i] & GIVEN: return
+        if solution:
+            if num == solution[r][c]:
+                if state.values[i] == 0: state.place(i, num); drop_trace()
+                board.values[i] = num; append_log(f"Filled cell ({r+1},{c+1}) = {num}.")
+            else:
+                show_message(f"Incorrect entry for cell ({r+1},{c+1}).")
+        else:
+            board.values[i] = num
+
+def type_digit(r, c, d):
+    # Above 9x9 a value may take two keys: it is entered as soon as no further
+    # digit could extend it (or on Enter), so "1" then "2" gives 12 on 16x16
+    global entry
+    if size <= 9:
+        enter_value(r, c, d); return
+    entry += str(d)
+    if int(entry) * 10 > size:
+        num = int(entry); entry = ""
+        enter_value(r, c, num)
+
+def handle_event(event):
+    global selected, entry
+    if event.type in (VIDEOEXPOSE, WINDOWEXPOSED): invalidate()
+    if event.type == SOLVE_EVENT: finish_solve(event.job)
+    elif event.type == TRACE_EVENT: finish_trace(event)
+    elif event.type == SOLVE_TIMEOUT_EVENT and solve_job is not None:
+        cancel_solve()
+        show_message(f"Too hard to check within {SOLVE_TIMEOUT_MS // 1000} s: possibly multiple solutions. Add more givens.")
+    if popup_active:
         if event.type == MOUSEBUTTONDOWN:
-            pos = event.pos; gx, gy = GRID_ORIGIN
-            if gx <= pos[0] < gx + CELL_SIZE * GRID_SIZE and gy <= pos[1] < gy + CELL_SIZE * GRID_SIZE:
-                c = (pos[0] - gx) // CELL_SIZE; r = (pos[1] - gy) // CELL_SIZE; selected = (r, c)
-            for rect, label in button_rects:
-                if rect.collidepoint(pos):
-                    if label == "Lock/Unlock": handle_lock_unlock()
-                    elif label == "Solve": handle_solve()
-                    elif label == "Next": handle_next()
-                    elif label == "Note": handle_note()
-                    elif label == "Clear All": handle_clear_all()
-        if event.type == KEYDOWN:
-            r, c = selected; cell = board[r][c]
-            if event.key in [K_UP, K_w]: selected = (max(r-1, 0), c)
-            elif event.key in [K_DOWN, K_s]: selected = (min(r+1, GRID_SIZE-1), c)
-            elif event.key in [K_LEFT, K_a]: selected = (r, max(c-1, 0))
-            elif event.key in [K_RIGHT, K_d]: selected = (r, min(c+1, GRID_SIZE-1))
-            elif K_1 <= event.key <= K_9:
-                num = event.key - K_0
-                if not locked: board[r][c]['value'] = num
-                else:
-                    if cell['given']: continue
-                    if solution:
-                        if num == solution[r][c]:
-                            cell['value'] = num; remove_notes_on_fill(r, c, num); append_log(f"Filled cell ({r+1},{c+1}) = {num}.")
-                        else:
-                            show_message(f"Incorrect entry for cell ({r+1},{c+1}).")
-                    else:
-                        board[r][c]['value'] = num
-            elif event.key in [K_BACKSPACE, K_DELETE, K_0]:
-                if not locked: board[r][c]['value'] = 0
-                else:
-                    if cell['given']: continue
-                    cell['value'] = 0
-    screen.fill(WHITE)
-    draw_grid(); draw_buttons(); draw_timer(); draw_log_panel()
-    if popup_active: draw_popup()
-    pygame.display.flip(); clock.tick(30)
+            pos = event.pos
+            for rect, label, callback in popup_clicks:
+                if rect.collidepoint(pos): callback()
+        return
+    if event.type == MOUSEBUTTONDOWN:
+        pos = event.pos; gx, gy = GRID_ORIGIN
+        if gx <= pos[0] < gx + cell_size * size and gy <= pos[1] < gy + cell_size * size:
+            c = (pos[0] - gx) // cell_size; r = (pos[1] - gy) // cell_size; selected = (r, c); entry = ""
+        for rect, label in button_rects:
+            if rect.collidepoint(pos):
+                if label == "Lock/Unlock": handle_lock_unlock()
+                elif label == "Solve": handle_solve()
+                elif label == "Next": handle_next()
+                elif label == "Note": handle_note()
+                elif label == "Clear All": handle_clear_all()
+                elif label == "Size": handle_size()
+    if event.type == KEYDOWN:
+        r, c = selected; i = r * size + c
+        if event.key in [K_UP, K_w, K_DOWN, K_s, K_LEFT, K_a, K_RIGHT, K_d]: entry = ""
+        if event.key in [K_UP, K_w]: selected = (max(r-1, 0), c)
+        elif event.key in [K_DOWN, K_s]: selected = (min(r+1, size-1), c)
+        elif event.key in [K_LEFT, K_a]: selected = (r, max(c-1, 0))
+        elif event.key in [K_RIGHT, K_d]: selected = (r, min(c+1, size-1))
+        elif event.key == K_F3: toggle_stats()
+        elif event.key == K_ESCAPE and solve_job is not None: cancel_solve(); append_log("Solve cancelled.")
+        elif solve_job is not None: return
+        elif event.key == K_ESCAPE: entry = ""
+        elif event.key in [K_RETURN, K_KP_ENTER]:
+            if entry: num = int(entry); entry = ""; enter_value(r, c, num)
+        elif K_1 <= event.key <= K_9 or (event.key == K_0 and entry):
+            type_digit(r, c, event.key - K_0)
+        elif event.key == K_BACKSPACE and entry: entry = entry[:-1]
+        elif event.key in [K_BACKSPACE, K_DELETE, K_0]:
+            if not locked: board.values[i] = 0
+            else:
+                if board.flags[i] & GIVEN: return
+                board.values[i] = 0; state.remove(i); drop_trace()
+
+# Main loop: sleeps in event.wait() until input, the clock tick or a worker wakes it
+def main():
+    global screen, font, note_font
+    stats.enable_from_env()
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Sudoku Solver")
+    font = pygame.font.SysFont(None, FONT_SIZE)
+    note_font = pygame.font.SysFont(None, NOTE_FONT_SIZE)
+    make_cell_fonts()
+    build_glyphs()
+    pygame.display.update(render_frame())
+    while True:
+        for event in [pygame.event.wait()] + pygame.event.get():
+            if event.type == QUIT: pygame.quit(); sys.exit()
+            handle_event(event)
+        sync_timer(); sync_notes()
+        rects = render_frame()
+        if rects: pygame.display.update(rects)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# Packed binary corpus: a 16-byte header, then fixed-size records of 41 bytes
+# (81 cells at 4 bits, high nibble first, 0 for empty), followed by 41 more
+# for the solution when the file has a solution column. Record i sits at
+# HEADER.size + i * record_size, so random access and sharding by offset are O(1).
+# Usage: python packed.py pack corpus.txt corpus.sdk [--solutions]
+#        python packed.py unpack corpus.sdk [corpus.txt]
+import argparse
+import mmap
+import struct
+import sys
+import dlx
+from solver import GRID_SIZE, format_grid, parse_grid
+
+MAGIC = b"SDKP"
+VERSION = 1
+HAS_SOLUTIONS = 1
+# magic, version, flags, record size, record count
+HEADER = struct.Struct("<4sBBHQ")
+CELLS = GRID_SIZE * GRID_SIZE
+GRID_BYTES = (CELLS + 1) // 2
+_HEX_DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
+_CELL_CHARS = frozenset("0123456789.")
+
+def pack_cells(text):
+    # 81-character line -> 41 bytes; the hex codec does the nibble packing.
+    # Anything else would shift every later record, so it is rejected.
+    if len(text) != CELLS or not _CELL_CHARS.issuperset(text):
+        raise ValueError(f"expected {CELLS} characters from 0-9 and '.', got {text[:CELLS + 10]!r}")
+    return bytes.fromhex(text.replace(".", "0") + "0" * (2 * GRID_BYTES - CELLS))
+
+def unpack_cells(raw):
+    # 41 bytes -> 81-character line with '0' for empty
+    return raw.hex()[:CELLS]
+
+def unpack_values(raw):
+    # 41 bytes -> flat list of 81 ints without going through text parsing
+    return list(raw.hex().encode().translate(_HEX_DIGITS)[:CELLS])
+
+def _rows(values):
+    return [values[r * GRID_SIZE:(r + 1) * GRID_SIZE] for r in range(GRID_SIZE)]
+
+class PackedWriter:
+    # Streams records to disk; the count in the header is patched on close
+    def __init__(self, path, solutions=False):
+        self.flags = HAS_SOLUTIONS if solutions else 0
+        self.record_size = GRID_BYTES * (2 if solutions else 1)
+        self.count = 0
+        self.f = open(path, "wb")
+        self.f.write(HEADER.pack(MAGIC, VERSION, self.flags, self.record_size, 0))
+
+    def write(self, puzzle, solution=None):
+        # puzzle / solution as 81-character strings
+        record = pack_cells(puzzle)
+        if self.flags & HAS_SOLUTIONS: record += pack_cells(solution)
+        self.f.write(record)
+        self.count += 1
+
+    def close(self):
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, self.flags, self.record_size, self.count))
+        self.f.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+class PackedCorpus:
+    # Read-only view of a packed file through mmap; nothing is decoded until asked
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.flags, self.record_size, self.count = HEADER.unpack_from(self.mm)
+        if magic != MAGIC or version != VERSION: raise ValueError(f"{path}: not a packed corpus (version {VERSION})")
+        if len(self.mm) < HEADER.size + self.count * self.record_size: raise ValueError(f"{path}: truncated")
+        self.has_solutions = bool(self.flags & HAS_SOLUTIONS)
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, i):
+        # Record i as bytes (puzzle, then solution if present)
+        if not 0 <= i < self.count: raise IndexError(i)
+        start = HEADER.size + i * self.record_size
+        return self.mm[start:start + self.record_size]
+
+    def text(self, i):
+        return unpack_cells(self.raw(i)[:GRID_BYTES])
+
+    def values(self, i):
+        # Puzzle i as a flat row-major list of 81 ints
+        return unpack_values(self.raw(i)[:GRID_BYTES])
+
+    def __getitem__(self, i):
+        # Puzzle i in the 9x9 list-of-lists form the solvers take
+        return _rows(self.values(i))
+
+    def solution(self, i):
+        if not self.has_solutions: return None
+        return _rows(unpack_values(self.raw(i)[GRID_BYTES:]))
+
+    def __iter__(self):
+        for i in range(self.count): yield self[i]
+
+    def arrays(self, start=0, stop=None):
+        # (N, 9, 9) uint8 puzzles (and solutions, or None) for batch_np;
+        # needs numpy. The records are read in place, only the unpacked cells are new.
+        import numpy as np
+        stop = self.count if stop is None else min(stop, self.count)
+        n = max(0, stop - start)
+        recs = np.frombuffer(self.mm, dtype=np.uint8, count=n * self.record_size,
+                             offset=HEADER.size + start * self.record_size).reshape(n, self.record_size)
+        def cells(packed):
+            out = np.empty((n, 2 * GRID_BYTES), dtype=np.uint8)
+            out[:, 0::2] = packed >> 4; out[:, 1::2] = packed & 15
+            return out[:, :CELLS].reshape(n, GRID_SIZE, GRID_SIZE)
+        return cells(recs[:, :GRID_BYTES]), (cells(recs[:, GRID_BYTES:]) if self.has_solutions else None)
+
+    def shard(self, index, count):
+        # Index range of shard `index` out of `count` near-equal shards
+        return range(self.count * index // count, self.count * (index + 1) // count)
+
+    def close(self):
+        self.mm.close()
+
+def pack_text(lines, path, solutions=False):
+    # Streams "puzzle [solution]" lines into a packed file; with solutions
+    # and no second column, the solution is computed with DLX
+    with PackedWriter(path, solutions) as w:
+        for n, line in enumerate(lines, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"): continue
+            puzzle = fields[0]
+            solution = None
+            try:
+                if solutions:
+                    solution = fields[1] if len(fields) > 1 else format_grid(dlx.solve(parse_grid(puzzle)) or [[0] * GRID_SIZE] * GRID_SIZE)
+                w.write(puzzle, solution)
+            except ValueError as e: raise ValueError(f"line {n}: {e}") from None
+        return w.count
+
+def unpack_text(path, out):
+    corpus = PackedCorpus(path)
+    try:
+        for i in range(len(corpus)):
+            rec = corpus.raw(i)
+            puzzle = unpack_cells(rec[:GRID_BYTES]).replace("0", ".")
+            out.write(f"{puzzle} {unpack_cells(rec[GRID_BYTES:])}\n" if corpus.has_solutions else puzzle + "\n")
+    finally:
+        corpus.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Convert between 81-character text corpora and the packed format.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("pack"); p.add_argument("src"); p.add_argument("dst")
+    p.add_argument("--solutions", action="store_true", help="store a solution column (second field, or solved with DLX)")
+    u = sub.add_parser("unpack"); u.add_argument("src"); u.add_argument("dst", nargs="?")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "pack":
+        with open(args.src) as f:
+            try: print(pack_text(f, args.dst, args.solutions), "puzzles", file=sys.stderr)
+            except ValueError as e: sys.exit(f"{args.src}: {e}")
+    elif args.dst:
+        with open(args.dst, "w") as out: unpack_text(args.src, out)
+    else:
+        unpack_text(args.src, sys.stdout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# Parallel backtracking for single hard puzzles: the search tree is split at
+# its tightest spots into subtrees that a process pool explores. A subtree
+# still open after SPLIT_NODES nodes comes back as the part not yet searched,
+# so idle workers pick up pieces of the hard branches. The other workers are
+# cancelled once enough solutions are found.
+# Usage: python parallel.py puzzle.txt [--workers 8] [--count]  (first puzzle of the file)
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+from queue import SimpleQueue
+from solver import SolverState, _branches, _propagate, format_grid, parse_grid
+
+# Nodes a worker searches before handing back the rest of its subtree
+SPLIT_NODES = 256
+# Workers check for cancellation every CANCEL_CHECK nodes (a power of two)
+CANCEL_CHECK = 16
+
+# solutions: up to limit full grids; nodes: search nodes per worker (index 0
+# is the parent's initial split); tasks: subtrees handed to workers
+Search = namedtuple('Search', 'solutions nodes tasks')
+
+def _rows(values, n):
+    return [list(values[r * n:(r + 1) * n]) for r in range(n)]
+
+def _state(values, n):
+    return SolverState(_rows(values, n))
+
+def explore(st, budget, limit, found, cancel=None):
+    # Depth-first search of st's subtree, appending full grids (as bytes) to
+    # found until it holds limit. Stops before the node after budget and
+    # returns what is left unsearched as grids, shallowest first: the untried
+    # branches of each open node, then the node it was about to enter. Returns
+    # [] once the subtree is done or limit is reached, None when cancelled.
+    frames = []  # [placed by propagation, branches, next branch] per open node
+    while True:
+        if st.nodes >= budget: return _rest(st, frames)
+        if not st.nodes & (CANCEL_CHECK - 1) and cancel is not None and cancel.is_set(): return None
+        st.nodes += 1
+        placed = []; branches = []
+        if _propagate(st, placed):
+            if st.empty: branches = _branches(st)
+            else:
+                found.append(bytes(st.values))
+                if len(found) >= limit: return []
+        frames.append([placed, branches, 0])
+        # Next untried branch of the deepest open node, closing finished ones
+        while frames:
+            frame = frames[-1]; placed, branches, k = frame
+            if k: st.remove(branches[k - 1][0])
+            if k < len(branches):
+                frame[2] = k + 1; st.place(*branches[k])
+                break
+            for i in reversed(placed): st.remove(i)
+            frames.pop()
+        if not frames: return []
+
+def _rest(st, frames):
+    # Unwinds st through frames, collecting the unexplored subtrees
+    rest = [bytes(st.values)]
+    for placed, branches, k in reversed(frames):
+        st.remove(branches[k - 1][0])
+        for i, d in branches[k:]:
+            st.values[i] = d; rest.append(bytes(st.values)); st.values[i] = 0
+        for i in reversed(placed): st.remove(i)
+    rest.reverse()
+    return rest
+
+_cancel = None
+
+def _init_worker(cancel):
+    global _cancel
+    _cancel = cancel
+
+def _task(args):
+    values, n, budget, limit = args
+    st = _state(values, n); found = []
+    rest = explore(st, budget, limit, found, _cancel)
+    return os.getpid(), st.nodes, found, rest or []
+
+def search(bd, workers=None, limit=1, split_nodes=SPLIT_NODES):
+    # Up to limit solutions of bd (limit=2 answers uniqueness like
+    # dlx.solve_unique) from a pool of workers sharing one search tree
+    workers = workers or multiprocessing.cpu_count()
+    n = len(bd); nodes = Counter(); found = []; tasks = 0
+    st = SolverState(bd)
+    if not st.consistent: return Search([], [0], 0)
+    # Split one node at a time in the parent until every worker has a subtree
+    stack = [bytes(st.values)]
+    while stack and len(stack) < 2 * workers and len(found) < limit:
+        sub = _state(stack.pop(0), n)
+        stack += explore(sub, 1, limit - len(found), found)
+        nodes[0] += sub.nodes
+    pids = {}
+    if stack and len(found) < limit:
+        cancel = multiprocessing.Event(); done = SimpleQueue()
+        with multiprocessing.Pool(workers, _init_worker, (cancel,)) as pool:
+            running = 0
+            while True:
+                while stack and running < workers and len(found) < limit:
+                    pool.apply_async(_task, ((stack.pop(), n, split_nodes, limit - len(found)),),
+                                     callback=done.put, error_callback=done.put)
+                    running += 1; tasks += 1
+                if not running: break
+                result = done.get(); running -= 1
+                if isinstance(result, BaseException): cancel.set(); raise result
+                pid, task_nodes, task_found, rest = result
+                nodes[pids.setdefault(pid, len(pids) + 1)] += task_nodes
+                found += task_found
+                if len(found) >= limit: cancel.set()
+                else: stack += rest
+    return Search([_rows(v, n) for v in found[:limit]], [nodes[w] for w in range(len(pids) + 1)], tasks)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Solve one puzzle with a parallel backtracking search.")
+    ap.add_argument("puzzle", help="puzzle file (first puzzle line is used) or the puzzle itself")
+    ap.add_argument("--workers", type=int, help="processes (default: all cores)")
+    ap.add_argument("--count", action="store_true", help="check uniqueness (stop at a second solution)")
+    ap.add_argument("--split-nodes", type=int, default=SPLIT_NODES, help="nodes searched before a subtree is split")
+    args = ap.parse_args(argv)
+
+    text = args.puzzle
+    if os.path.exists(text):
+        with open(text) as f: text = next(l.split()[0] for l in f if l.strip() and not l.startswith("#"))
+    started = time.perf_counter()
+    result = search(parse_grid(text), args.workers, 2 if args.count else 1, args.split_nodes)
+    elapsed = time.perf_counter() - started
+    print(format_grid(result.solutions[0]) if result.solutions else "no solution")
+    if args.count: print(["no solution", "unique", "multiple solutions"][len(result.solutions)])
+    print(f"{elapsed * 1000:.1f} ms, {sum(result.nodes)} nodes in {result.tasks} tasks; per worker: "
+          + " ".join(map(str, result.nodes[1:])) + f" (split {result.nodes[0]})", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
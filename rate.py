@@ -0,0 +1,119 @@
+# Difficulty rating from a headless replay of the Next cascade: the score is
+# the weight of the hardest technique used, the histogram counts every step.
+# Usage: python rate.py corpus.txt [--workers 8] [--out ratings.jsonl]
+import argparse
+import json
+import multiprocessing
+import sys
+from collections import Counter, namedtuple
+import steps
+from canon import PuzzleCache
+from solver import parse_grid
+
+# Weights follow the usual Sudoku Explainer scale; a walk that gets stuck
+# scores UNSOLVED_SCORE
+TECHNIQUE_SCORES = {
+    "Hidden Single": 1.5, "Naked Single": 2.3,
+    "Pointing": 2.6, "Box/Line": 2.8,
+    "Naked Pair": 3.0, "X-Wing": 3.2, "Hidden Pair": 3.4, "Naked Trio": 3.6, "Swordfish": 3.8,
+    "Hidden Trio": 4.0, "Naked Quad": 5.0, "Jellyfish": 5.2, "Hidden Quad": 5.4,
+    "Simple Coloring": 5.6, "Remote Pair": 5.8, "X-Chain": 6.4, "XY-Chain": 6.6,
+}
+UNSOLVED_SCORE = 10.0
+
+# Hardest technique tier needed; "expert" when the walk gets stuck
+DIFFICULTIES = ["easy", "medium", "hard", "expert"]
+TECHNIQUE_LEVELS = {
+    "Naked Single": 0, "Hidden Single": 0,
+    "Pointing": 1, "Box/Line": 1,
+    "Naked Pair": 1, "Hidden Pair": 1, "Naked Trio": 1, "Hidden Trio": 1, "Naked Quad": 1, "Hidden Quad": 1,
+    "X-Wing": 2, "Swordfish": 2, "Jellyfish": 2,
+    "Simple Coloring": 2, "Remote Pair": 2, "X-Chain": 2, "XY-Chain": 2,
+}
+
+Rating = namedtuple('Rating', 'score difficulty solved histogram')
+
+# Tasks in flight per worker and chunk: the pool sees at most
+# workers * chunksize * WINDOW_CHUNKS lines at a time, so every worker still
+# has chunks queued while the end of a window is being rated
+WINDOW_CHUNKS = 8
+CHUNKSIZE = 64
+
+def rate(grid, cache=None):
+    # With a PuzzleCache, a grid rated before (in any run sharing the cache)
+    # is not replayed again. The cascade depends on orientation, so only the
+    # same grid hits, never a rotated or relabelled copy.
+    if cache is not None:
+        score, difficulty, solved, histogram = cache.cached(grid, "rating", lambda g: list(rate(g)))
+        return Rating(score, difficulty, solved, Counter(histogram))
+    found, solved = steps.trace(grid)
+    histogram = Counter(s.technique for s in found if s.technique in TECHNIQUE_SCORES)
+    if not solved: return Rating(UNSOLVED_SCORE, DIFFICULTIES[-1], False, histogram)
+    score = max((TECHNIQUE_SCORES[t] for t in histogram), default=0.0)
+    level = max((TECHNIQUE_LEVELS[t] for t in histogram), default=0)
+    return Rating(score, DIFFICULTIES[level], True, histogram)
+
+def grade(grid):
+    return rate(grid).difficulty
+
+_cache = None
+
+def _open_cache(path):
+    global _cache
+    _cache = PuzzleCache(path=path) if path else None
+
+def _rate_line(line):
+    # A malformed line gets an error record instead of stopping the batch
+    try: grid = parse_grid(line)
+    except ValueError as e: return json.dumps({"puzzle": line, "error": str(e)})
+    r = rate(grid, _cache)
+    return json.dumps({"puzzle": line, "score": r.score, "difficulty": r.difficulty, "solved": r.solved,
+                       "techniques": dict(r.histogram)})
+
+def puzzle_lines(lines):
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"): yield line.split()[0]
+
+def windows(items, size):
+    # Pool.imap reads its whole input up front, so feed it bounded slices
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) == size:
+            yield window; window = []
+    if window: yield window
+
+def rate_many(lines, workers=None, cache_path=None):
+    # Yields one JSON line per puzzle line, in input order. cache_path is an
+    # SQLite PuzzleCache shared by all workers and later runs.
+    if workers == 1:
+        _open_cache(cache_path)
+        yield from map(_rate_line, puzzle_lines(lines))
+        return
+    workers = workers or multiprocessing.cpu_count()
+    with multiprocessing.Pool(workers, _open_cache, (cache_path,)) as pool:
+        for window in windows(puzzle_lines(lines), workers * CHUNKSIZE * WINDOW_CHUNKS):
+            yield from pool.imap(_rate_line, window, CHUNKSIZE)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Rate puzzles by the techniques the logical walk needs.")
+    ap.add_argument("paths", nargs="*", help="puzzle files (default stdin)")
+    ap.add_argument("--workers", type=int, help="processes (default: all cores)")
+    ap.add_argument("--out", help="output file (default stdout)")
+    ap.add_argument("--cache", help="SQLite cache file for ratings of repeat puzzles")
+    args = ap.parse_args(argv)
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    def run(f):
+        for result in rate_many(f, args.workers, args.cache): out.write(result + "\n")
+    try:
+        if not args.paths: run(sys.stdin)
+        for path in args.paths:
+            with open(path) as f: run(f)
+    finally:
+        if out is not sys.stdout: out.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+# Local solve service: JSON-lines requests over stdin/stdout or a Unix socket,
+# answered by warm worker processes. Requests that arrive while the workers
+# are busy are sent over in batches, and repeats come from an in-memory cache.
+# Usage: python serve.py [--socket /tmp/sudoku.sock] [--workers 4] [--batch 64]
+#   {"id": 1, "op": "solve", "puzzle": "53..7...."} -> {"id": 1, "status": "unique", "solution": "534678..."}
+#   {"id": 2, "op": "hint", "puzzle": "53..7...."}  -> {"id": 2, "status": "unique", "hint": {step as in steps.py}}
+#   {"id": 3, "op": "stats"}                         -> {"id": 3, "requests": ..., "cache_hits": ..., "batches": ...}
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import dlx
+import steps
+from solver import SolverState, format_grid, parse_grid
+
+# dlx.solve_unique count -> status, as in solve.py
+STATUS = {0: "invalid", 1: "unique", 2: "multiple"}
+OPS = ("solve", "hint")
+# Requests read from one client but not yet answered; reading pauses beyond this
+MAX_PENDING = 4096
+# Connections the kernel queues before they are accepted
+BACKLOG = 4096
+
+def answer(op, puzzle):
+    # Response fields for one request. A hint is the next step of the Next
+    # cascade (notes taken as shown), given only for puzzles with one solution.
+    try: grid = parse_grid(puzzle)
+    except ValueError as e: return {"error": str(e)}
+    sol, count = dlx.solve_unique(grid)
+    result = {"status": STATUS[count]}
+    if op == "solve":
+        if sol: result["solution"] = format_grid(sol)
+    elif count == 1:
+        step = next(steps.iter_steps(SolverState(grid), notes_initialized=True), None)
+        result["hint"] = steps.step_to_json(step, len(grid)) if step else None
+    return result
+
+def answer_batch(batch):
+    return [answer(op, puzzle) for op, puzzle in batch]
+
+def _ready():
+    return os.getpid()
+
+class Service:
+    # Front end shared by all clients. Each (op, puzzle) is computed once:
+    # results stay in an LRU of cache_size entries, and identical requests
+    # made while one is queued or running wait on the same future.
+    def __init__(self, workers=None, batch=64, cache_size=65536):
+        self.workers = workers or os.cpu_count()
+        self.batch = batch
+        self.cache_size = cache_size
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.results = OrderedDict()
+        self.pending = {}
+        self.queue = []
+        self.wakeup = asyncio.Event()
+        # Two batches per worker in flight: one running, one ready to go
+        self.slots = asyncio.Semaphore(2 * self.workers)
+        self.running = set()
+        self.counts = {"requests": 0, "cache_hits": 0, "batches": 0, "solved": 0}
+
+    async def start(self):
+        # Forks the workers (after the solver is imported) and waits for them
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ready) for _ in range(self.workers)))
+        self.running.add(asyncio.create_task(self._dispatch()))
+
+    def close(self):
+        for task in self.running: task.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    async def answer(self, op, puzzle):
+        self.counts["requests"] += 1
+        key = (op, puzzle)
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key); self.counts["cache_hits"] += 1
+            return result
+        future = self.pending.get(key)
+        if future is None:
+            future = self.pending[key] = asyncio.get_running_loop().create_future()
+            self.queue.append(key); self.wakeup.set()
+        return await future
+
+    async def _dispatch(self):
+        # An idle pool gets each request at once; while every slot is taken the
+        # queue grows, and the next free slot takes a share of it as one batch
+        while True:
+            await self.wakeup.wait()
+            await self.slots.acquire()
+            size = min(self.batch, -(-len(self.queue) // self.workers))
+            batch = self.queue[:size]; del self.queue[:size]
+            if not self.queue: self.wakeup.clear()
+            task = asyncio.create_task(self._run(batch))
+            self.running.add(task); task.add_done_callback(self.running.discard)
+
+    async def _run(self, batch):
+        try:
+            try: results = await asyncio.get_running_loop().run_in_executor(self.pool, answer_batch, batch)
+            except Exception as e: results = [{"error": f"worker failed: {e!r}"}] * len(batch)
+            self.counts["batches"] += 1; self.counts["solved"] += len(batch)
+            for key, result in zip(batch, results):
+                if "error" not in result: self._remember(key, result)
+                self.pending.pop(key).set_result(result)
+        finally: self.slots.release()
+
+    def _remember(self, key, result):
+        self.results[key] = result
+        if len(self.results) > self.cache_size: self.results.popitem(last=False)
+
+    async def handle(self, line, send):
+        try:
+            request = json.loads(line)
+            rid = request.get("id"); op = request.get("op", "solve")
+        except (ValueError, AttributeError):
+            send({"id": None, "error": "request must be a JSON object"}); return
+        if op == "stats":
+            send({"id": rid, **self.counts, "cached": len(self.results), "workers": self.workers}); return
+        puzzle = request.get("puzzle")
+        if op not in OPS: send({"id": rid, "error": f"unknown op {op!r}"}); return
+        if not isinstance(puzzle, str): send({"id": rid, "error": "puzzle must be a string"}); return
+        send({"id": rid, **await self.answer(op, puzzle.strip())})
+
+async def serve_lines(service, readline, send):
+    # One client: requests are answered concurrently, responses go out as they
+    # finish (match them up by id)
+    pending = asyncio.Semaphore(MAX_PENDING); tasks = set()
+    async def one(line):
+        try: await service.handle(line, send)
+        finally: pending.release()
+    while line := await readline():
+        if not line.strip(): continue
+        await pending.acquire()
+        task = asyncio.create_task(one(line))
+        tasks.add(task); task.add_done_callback(tasks.discard)
+    if tasks: await asyncio.wait(tasks)
+
+async def serve_connection(service, reader, writer):
+    send = lambda response: writer.write((json.dumps(response) + "\n").encode())
+    try:
+        await serve_lines(service, reader.readline, send)
+        await writer.drain()
+    except ConnectionError: pass
+    finally: writer.close()
+
+async def serve_stdio(service):
+    # stdin may be a file or a terminal, which asyncio cannot watch, so a thread
+    # reads it; the bounded queue stops that thread when requests pile up.
+    # Output is flushed once per event loop pass rather than per response.
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue(MAX_PENDING)
+    def pump():
+        for line in sys.stdin.buffer: asyncio.run_coroutine_threadsafe(lines.put(line), loop).result()
+        asyncio.run_coroutine_threadsafe(lines.put(b""), loop).result()
+    threading.Thread(target=pump, daemon=True).start()
+    flush_due = False
+    def flush():
+        nonlocal flush_due
+        flush_due = False; sys.stdout.flush()
+    def send(response):
+        nonlocal flush_due
+        sys.stdout.write(json.dumps(response) + "\n")
+        if not flush_due: flush_due = True; loop.call_soon(flush)
+    await serve_lines(service, lines.get, send)
+    sys.stdout.flush()
+
+async def run(args):
+    service = Service(args.workers, args.batch, args.cache)
+    await service.start()
+    try:
+        if args.socket:
+            server = await asyncio.start_unix_server(lambda r, w: serve_connection(service, r, w), path=args.socket,
+                                                  backlog=BACKLOG)
+            print(f"Listening on {args.socket} with {service.workers} workers", file=sys.stderr)
+            async with server: await server.serve_forever()
+        else: await serve_stdio(service)
+    finally: service.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve solve and hint requests as JSON lines from warm worker processes.")
+    ap.add_argument("--socket", help="Unix socket path to listen on (default: stdin/stdout)")
+    ap.add_argument("--workers", type=int, help="processes (default: all cores)")
+    ap.add_argument("--batch", type=int, default=64, help="most requests sent to a worker at once")
+    ap.add_argument("--cache", type=int, default=65536, help="results kept in memory")
+    args = ap.parse_args(argv)
+    try: asyncio.run(run(args))
+    except KeyboardInterrupt: pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# Batch solver: puzzle lines from files or stdin, solved with DLX over a
+# process pool, one result per puzzle streamed to stdout as JSON lines or CSV.
+# Usage: python solve.py corpus.txt [more.txt corpus.sdk] [--workers 8] [--chunksize 64]
+#        [--format jsonl|csv] [--unordered] [--out results.jsonl]
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+import time
+from collections import Counter
+import dlx
+import packed
+from rate import WINDOW_CHUNKS, puzzle_lines, windows
+from solver import format_grid, parse_grid
+
+FIELDS = ["puzzle", "status", "solution", "ms"]
+
+def solve_line(line):
+    # (puzzle, status, solution, ms): status is unique, multiple (solution is
+    # the first one found) or invalid (malformed, clashing or unsolvable)
+    started = time.perf_counter()
+    try: grid = parse_grid(line)
+    except ValueError: return line, "invalid", "", 0.0
+    sol, count = dlx.solve_unique(grid)
+    ms = (time.perf_counter() - started) * 1000
+    if count == 0: return line, "invalid", "", round(ms, 3)
+    return line, "unique" if count == 1 else "multiple", format_grid(sol), round(ms, 3)
+
+def solve_many(lines, workers=None, chunksize=64, ordered=True):
+    # Yields solve_line results; in input order unless ordered is False.
+    # Input goes to the pool in bounded windows, so memory stays flat.
+    if workers == 1:
+        yield from map(solve_line, lines)
+        return
+    workers = workers or multiprocessing.cpu_count()
+    with multiprocessing.Pool(workers) as pool:
+        run = pool.imap if ordered else pool.imap_unordered
+        for window in windows(lines, workers * chunksize * WINDOW_CHUNKS):
+            yield from run(solve_line, window, chunksize)
+
+def read_lines(paths):
+    # Puzzle lines of text corpora (stdin when no paths) and packed .sdk files
+    if not paths: yield from puzzle_lines(sys.stdin)
+    for path in paths:
+        if path.endswith(".sdk"):
+            corpus = packed.PackedCorpus(path)
+            try: yield from (corpus.text(i) for i in range(len(corpus)))
+            finally: corpus.close()
+        else:
+            with open(path) as f: yield from puzzle_lines(f)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Solve puzzle files over a process pool, streaming one result per puzzle.")
+    ap.add_argument("paths", nargs="*", help="puzzle files, text or packed .sdk (default stdin)")
+    ap.add_argument("--workers", type=int, help="processes (default: all cores)")
+    ap.add_argument("--chunksize", type=int, default=64, help="puzzles per task sent to a worker")
+    ap.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    ap.add_argument("--unordered", action="store_true", help="write results as they finish instead of in input order")
+    ap.add_argument("--out", help="output file (default stdout)")
+    args = ap.parse_args(argv)
+
+    out = open(args.out, "w", newline="") if args.out else sys.stdout
+    if args.format == "csv":
+        writer = csv.writer(out); writer.writerow(FIELDS)
+        write = writer.writerow
+    else:
+        write = lambda row: out.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+    totals = Counter(); started = time.perf_counter()
+    try:
+        for row in solve_many(read_lines(args.paths), args.workers, args.chunksize, not args.unordered):
+            write(row); totals[row[1]] += 1
+    finally:
+        if out is not sys.stdout: out.close()
+    elapsed = time.perf_counter() - started; n = sum(totals.values())
+    print(f"{n} puzzles in {elapsed:.1f} s ({n / elapsed if elapsed else 0:.0f}/s): "
+          + ", ".join(f"{totals[s]} {s}" for s in ("unique", "multiple", "invalid")), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
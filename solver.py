@@ -0,0 +1,766 @@
+# Sudoku solver core: board model, solvers and techniques. Pure Python with no
+# pygame dependency or import-time side effects, so workers and CLI tools can
+# import it cheaply; main.py is the GUI client. Grids are N x N with N = box**2
+# (4x4, 9x9, 16x16, 25x25); the module-level tables are the 9x9 ones.
+from array import array
+from collections import namedtuple
+from itertools import islice
+from math import isqrt
+import time
+import dlx
+
+GRID_SIZE = 9
+BOX_SIZE = 3
+BOX_SIZES = (2, 3, 4, 5)
+
+# One logical step. technique: name used in the log; cells: flat cell indices
+# involved; digits: digits involved; eliminations: (cell, mask) pairs removed
+# from the notes; place: (cell, digit) for steps that fill a cell, else None.
+Step = namedtuple('Step', 'technique cells digits eliminations explanation place')
+
+# Board model for the GUI: 32-bit note masks, values and flags of the cells
+# live in one bytearray, reached through memoryviews, so a copy is a single
+# buffer copy and a 9x9 board costs about 1 KB instead of 81 dicts.
+GIVEN = 1
+CORRECT = 2
+
+class Board:
+    __slots__ = ('size', 'buf', 'values', 'flags', 'notes')
+
+    def __init__(self, size=GRID_SIZE, buf=None):
+        n = size * size
+        self.size = size
+        self.buf = bytearray(6 * n) if buf is None else buf
+        view = memoryview(self.buf)
+        # Notes first so the 4-byte view starts aligned
+        self.notes = view[:4 * n].cast('I')
+        self.values = view[4 * n:5 * n]
+        self.flags = view[5 * n:]
+
+    def copy(self):
+        return Board(self.size, bytearray(self.buf))
+
+    def grid(self):
+        n = self.size
+        return [list(self.values[r * n:(r + 1) * n]) for r in range(n)]
+
+    def set_notes(self, masks=None):
+        # masks: one candidate mask per cell (e.g. SolverState.cand), or None to clear
+        self.notes[:] = array('I', masks) if masks is not None else array('I', bytes(4 * len(self.notes)))
+
+# Text format: N*N characters in row order, digits 1-9 then A-P for 10-25,
+# with 0 or '.' for empty
+DIGIT_CHARS = "123456789ABCDEFGHIJKLMNOP"
+_CHAR_VALUES = {ch: v for v, ch in enumerate("." + DIGIT_CHARS)}
+_CHAR_VALUES.update({"0": 0}, **{ch.lower(): v for ch, v in _CHAR_VALUES.items() if ch.isalpha()})
+
+def parse_grid(text):
+    text = text.strip()
+    n = isqrt(len(text))
+    if n * n != len(text) or isqrt(n) ** 2 != n or not 4 <= n <= len(DIGIT_CHARS):
+        raise ValueError(f"expected 16, 81, 256 or 625 cells, got {len(text)}")
+    values = [_CHAR_VALUES.get(ch, -1) for ch in text]
+    if not all(0 <= v <= n for v in values): raise ValueError(f"invalid cell character for a {n}x{n} grid")
+    return [values[r * n:(r + 1) * n] for r in range(n)]
+
+def format_grid(bd):
+    return ''.join(DIGIT_CHARS[v - 1] if v else '.' for row in bd for v in row)
+
+def box_size(n):
+    # Box side of an N x N grid
+    box = isqrt(n)
+    if box * box != n or box not in BOX_SIZES: raise ValueError(f"unsupported grid size {n}")
+    return box
+
+# Solver utilities
+class _Computed:
+    # Stands in for a lookup table that would be too large to build (masks of
+    # more than 16 digits)
+    __slots__ = ('fn',)
+    def __init__(self, fn): self.fn = fn
+    def __getitem__(self, m): return self.fn(m)
+
+class Geometry:
+    # Lookup tables for one grid size. Digit d is bit (d-1) of a mask; cells
+    # are flat indices r*N+c; units 0..N-1 are rows, N..2N-1 columns and
+    # 2N..3N-1 boxes. Bitboards are N*N-bit ints with bit i for cell i.
+    def __init__(self, box):
+        n = box * box; cells = n * n
+        self.box = box; self.size = n; self.cells = cells
+        self.all_digits = (1 << n) - 1
+        if n <= 16: self.popcount = [bin(m).count('1') for m in range(self.all_digits + 1)]
+        else: self.popcount = _Computed(int.bit_count)
+        digits = lambda m: tuple(d for d in range(1, n + 1) if m >> (d - 1) & 1)
+        if n <= 9: self.mask_digits = [digits(m) for m in range(self.all_digits + 1)]
+        else: self.mask_digits = _Computed(digits)
+        self.bit_index = {1 << k: k for k in range(n)}
+        self.row_of = [i // n for i in range(cells)]
+        self.col_of = [i % n for i in range(cells)]
+        self.box_of = [(i // n // box) * box + i % n // box for i in range(cells)]
+        self.units = ([[r * n + c for c in range(n)] for r in range(n)] +
+                      [[r * n + c for r in range(n)] for c in range(n)] +
+                      [[(b // box * box + k // box) * n + b % box * box + k % box for k in range(n)] for b in range(n)])
+        self.cell_units = [(self.row_of[i], n + self.col_of[i], 2 * n + self.box_of[i]) for i in range(cells)]
+        self.pos_in_unit = [(self.col_of[i], self.row_of[i], (self.row_of[i] % box) * box + self.col_of[i] % box)
+                            for i in range(cells)]
+        self.peers = [sorted(set(self.units[u0] + self.units[u1] + self.units[u2]) - {i})
+                      for i, (u0, u1, u2) in enumerate(self.cell_units)]
+        self.unit_bits = [(1 << u0) | (1 << u1) | (1 << u2) for (u0, u1, u2) in self.cell_units]
+        self.all_units = (1 << (3 * n)) - 1
+        # Cell bitboard of every unit; unit position masks split into box-wide
+        # parts (box rows/columns inside a box, box segments of a row or column)
+        self.unit_bb = [sum(1 << i for i in cells) for cells in self.units]
+        self.peer_bb = [sum(1 << p for p in peers) for peers in self.peers]
+        self.box_bands = [((1 << box) - 1) << (box * t) for t in range(box)]
+        self.box_stacks = [sum(1 << (box * s) for s in range(box)) << t for t in range(box)]
+        self.line_thirds = self.box_bands
+
+_GEOMETRIES = {}
+
+def geometry(box=BOX_SIZE):
+    # Tables are built once per box size, on first use
+    if box not in _GEOMETRIES: _GEOMETRIES[box] = Geometry(box)
+    return _GEOMETRIES[box]
+
+class SolverState:
+    # Placed-digit masks per row/column/box, a candidate mask per cell and,
+    # for every unit and digit, a mask of the unit positions still open to it.
+    # The candidate masks double as the pencil marks: they follow fills,
+    # erases and eliminations incrementally. Every change marks its three
+    # units dirty so techniques only rescan units changed since their last pass.
+    # The grid size comes from bd, or from box for an empty grid.
+    def __init__(self, bd=None, box=BOX_SIZE):
+        g = self.geo = geometry(box if bd is None else box_size(len(bd)))
+        n = g.size
+        self.values = [0] * g.cells
+        self.rows = [0] * n
+        self.cols = [0] * n
+        self.boxes = [0] * n
+        self.cand = [g.all_digits] * g.cells
+        self.where = [[(1 << n) - 1] * n for _ in range(3 * n)]
+        self.empty = g.cells
+        self.consistent = True
+        self.nodes = 0
+        self.max_nodes = float('inf')
+        self.dirty = 0
+        self._pending = {}
+        self.strong = [0] * n
+        self.bivalue = 0
+        if bd is None: return
+        for r in range(n):
+            for c in range(n):
+                d = bd[r][c]
+                if d == 0: continue
+                if not self.cand[r * n + c] >> (d - 1) & 1: self.consistent = False
+                else: self.place(r * n + c, d)
+
+    def allowed(self, i, d):
+        return self.cand[i] >> (d - 1) & 1 == 1
+
+    def candidates(self, r, c):
+        return list(self.geo.mask_digits[self.cand[r * self.geo.size + c]])
+
+    def _drop(self, i, k):
+        g = self.geo
+        self.cand[i] &= ~(1 << k)
+        self.dirty |= g.unit_bits[i]
+        for u, p in zip(g.cell_units[i], g.pos_in_unit[i]): self.where[u][k] &= ~(1 << p)
+
+    def place(self, i, d):
+        # _drop inlined: this is the hot path of the search
+        g = self.geo; cand = self.cand; where = self.where
+        cell_units = g.cell_units; pos_in_unit = g.pos_in_unit; unit_bits = g.unit_bits
+        b = 1 << (d - 1); k = d - 1
+        self.values[i] = d
+        self.rows[g.row_of[i]] |= b; self.cols[g.col_of[i]] |= b; self.boxes[g.box_of[i]] |= b
+        m = cand[i]; cand[i] = 0
+        dirty = unit_bits[i]
+        lines = [(where[u], ~(1 << p)) for u, p in zip(cell_units[i], pos_in_unit[i])]
+        while m:
+            low = m & -m; m ^= low
+            n = g.bit_index[low]
+            for w, keep in lines: w[n] &= keep
+        for p in g.peers[i]:
+            if cand[p] & b:
+                cand[p] &= ~b; dirty |= unit_bits[p]
+                for u, q in zip(cell_units[p], pos_in_unit[p]): where[u][k] &= ~(1 << q)
+        self.dirty |= dirty
+        self.empty -= 1
+
+    def remove(self, i):
+        # The inverse of place, inlined the same way
+        d = self.values[i]
+        if d == 0: return
+        g = self.geo; row_of, col_of, box_of = g.row_of, g.col_of, g.box_of
+        values = self.values; rows = self.rows; cols = self.cols; boxes = self.boxes
+        cand = self.cand; where = self.where
+        cell_units = g.cell_units; pos_in_unit = g.pos_in_unit; unit_bits = g.unit_bits
+        k = d - 1; b = 1 << k
+        values[i] = 0
+        rows[row_of[i]] &= ~b; cols[col_of[i]] &= ~b; boxes[box_of[i]] &= ~b
+        self.empty += 1
+        m = g.all_digits & ~(rows[row_of[i]] | cols[col_of[i]] | boxes[box_of[i]])
+        cand[i] = m
+        dirty = unit_bits[i]
+        lines = [(where[u], 1 << p) for u, p in zip(cell_units[i], pos_in_unit[i])]
+        while m:
+            low = m & -m; m ^= low
+            n = g.bit_index[low]
+            for w, bit in lines: w[n] |= bit
+        for p in g.peers[i]:
+            if values[p] or cand[p] & b: continue
+            if not (rows[row_of[p]] | cols[col_of[p]] | boxes[box_of[p]]) & b:
+                cand[p] |= b; dirty |= unit_bits[p]
+                for u, q in zip(cell_units[p], pos_in_unit[p]): where[u][k] |= 1 << q
+        self.dirty |= dirty
+
+    def eliminate(self, i, mask):
+        m = self.cand[i] & mask
+        while m:
+            low = m & -m; m ^= low
+            self._drop(i, self.geo.bit_index[low])
+
+    def placed(self, u):
+        # Mask of the digits already placed in unit u
+        n = self.geo.size
+        return (self.rows, self.cols, self.boxes)[u // n][u % n]
+
+    def pending_units(self, name):
+        # Units technique `name` has not scanned since they last changed
+        if self.dirty:
+            for key in self._pending: self._pending[key] |= self.dirty
+            self.dirty = 0
+        return self._pending.setdefault(name, self.geo.all_units)
+
+    def mark_scanned(self, name, units):
+        self._pending[name] &= ~units
+
+    def digit_cells(self, k):
+        # Bitboard of the cells that still take digit k+1, read off the row position masks
+        n = self.geo.size; where = self.where; bb = 0
+        for r in range(n): bb |= where[r][k] << (r * n)
+        return bb
+
+    def links(self):
+        # Link graph for the chain techniques: per digit, a mask of the units
+        # where it has exactly two places (its strong links), and the bitboard
+        # of two-candidate cells. Only units changed since the last call are
+        # refreshed; every cell change dirties its row, so rows cover bivalue.
+        g = self.geo; popcount = g.popcount
+        todo = self.pending_units("Links")
+        for u in range(3 * g.size):
+            if not todo >> u & 1: continue
+            bit = 1 << u; where = self.where[u]
+            for k in range(g.size):
+                if popcount[where[k]] == 2: self.strong[k] |= bit
+                else: self.strong[k] &= ~bit
+            if u >= g.size: continue
+            for i in g.units[u]:
+                if popcount[self.cand[i]] == 2: self.bivalue |= 1 << i
+                else: self.bivalue &= ~(1 << i)
+        self.mark_scanned("Links", todo)
+        return self.strong, self.bivalue
+
+    def naked_single(self):
+        for i in range(self.geo.cells):
+            m = self.cand[i]
+            if m and m & (m - 1) == 0: return i, self.geo.bit_index[m] + 1
+        return None
+
+    def copy(self):
+        st = SolverState.__new__(SolverState)
+        st.__dict__.update(self.__dict__)
+        st.values = self.values[:]; st.rows = self.rows[:]; st.cols = self.cols[:]; st.boxes = self.boxes[:]
+        st.cand = self.cand[:]; st.where = [w[:] for w in self.where]; st._pending = dict(self._pending)
+        st.strong = self.strong[:]
+        return st
+
+    def grid(self):
+        n = self.geo.size
+        return [self.values[r * n:(r + 1) * n] for r in range(n)]
+
+# Raised by both searches when their node budget runs out
+SearchAborted = dlx.SearchAborted
+
+def _propagate(st, placed):
+    # Naked and hidden singles until nothing changes; False on a cell or a
+    # unit-digit with no place left. Every fill is appended to placed so the
+    # caller can take it back.
+    g = st.geo; n = g.size; values = st.values; cand = st.cand; where = st.where
+    changed = True
+    while changed and st.empty:
+        changed = False
+        for i in range(g.cells):
+            if values[i]: continue
+            m = cand[i]
+            if not m: return False
+            if not m & (m - 1):
+                st.place(i, g.bit_index[m] + 1); placed.append(i); changed = True
+        for u in range(3 * n):
+            missing = g.all_digits & ~st.placed(u)
+            while missing:
+                low = missing & -missing; missing ^= low
+                k = g.bit_index[low]; m = where[u][k]
+                if not m: return False
+                if not m & (m - 1):
+                    i = g.units[u][g.bit_index[m]]
+                    st.place(i, k + 1); placed.append(i); changed = True
+    return True
+
+def _branches(st):
+    # (cell, digit) choices at the tightest spot: the empty cell with the
+    # fewest candidates, or the unit-digit with the fewest places if that is
+    # tighter (the column DLX would pick)
+    g = st.geo; popcount = g.popcount; values = st.values; cand = st.cand
+    best = None; fewest = g.size + 1
+    for i in range(g.cells):
+        if values[i]: continue
+        c = popcount[cand[i]]
+        if c < fewest:
+            best, fewest = i, c
+            if c == 2: return [(best, d) for d in g.mask_digits[cand[best]]]
+    choices = [(best, d) for d in g.mask_digits[cand[best]]]
+    for u in range(3 * g.size):
+        where = st.where[u]; missing = g.all_digits & ~st.placed(u)
+        while missing:
+            low = missing & -missing; missing ^= low
+            k = g.bit_index[low]; c = popcount[where[k]]
+            if c < fewest:
+                fewest = c; cells = g.units[u]
+                choices = [(cells[p], k + 1) for p in range(g.size) if where[k] >> p & 1]
+                if c == 2: return choices
+    return choices
+
+def _search(st):
+    st.nodes += 1
+    if st.nodes > st.max_nodes: raise SearchAborted(st.nodes)
+    placed = []
+    if _propagate(st, placed):
+        if not st.empty: return True
+        for i, num in _branches(st):
+            st.place(i, num)
+            if _search(st): return True
+            st.remove(i)
+    for i in reversed(placed): st.remove(i)
+    return False
+
+def backtrack(st, max_nodes=None):
+    # Fills st in place, propagating singles and then branching at the most
+    # constrained cell or unit; st.nodes counts the search nodes visited and
+    # SearchAborted is raised once max_nodes is exceeded
+    if max_nodes is not None: st.max_nodes = max_nodes
+    return st.consistent and _search(st)
+
+def _solutions(st):
+    # _search as a generator: yields st each time it is full, then carries on.
+    # Closing it early still takes every placement back.
+    st.nodes += 1
+    if st.nodes > st.max_nodes: raise SearchAborted(st.nodes)
+    placed = []
+    try:
+        if _propagate(st, placed):
+            if not st.empty: yield st
+            else:
+                for i, num in _branches(st):
+                    st.place(i, num)
+                    try: yield from _solutions(st)
+                    finally: st.remove(i)
+    finally:
+        for i in reversed(placed): st.remove(i)
+
+def iter_solutions(bd, limit=None, max_nodes=None):
+    # Solutions of bd as grids, found one at a time (at most limit of them)
+    st = SolverState(bd)
+    if not st.consistent: return
+    if max_nodes is not None: st.max_nodes = max_nodes
+    found = _solutions(st)
+    try:
+        for full in islice(found, limit): yield full.grid()
+    finally: found.close()
+
+def has_solution(st):
+    # Whether st can be completed; st is left as it was
+    found = _solutions(st)
+    try: return next(found, None) is not None
+    finally: found.close()
+
+def other_solution(st, cells, solution):
+    # Whether st has a solution besides `solution` (flat values), when any
+    # solution that agrees with it on the empty `cells` is that solution: cell
+    # j takes each other candidate in turn, with the cells before it fixed to
+    # `solution`. st is left as it was.
+    fixed = []
+    try:
+        for i in cells:
+            d = solution[i]
+            for other in st.geo.mask_digits[st.cand[i] & ~(1 << (d - 1))]:
+                st.place(i, other)
+                found = has_solution(st)
+                st.remove(i)
+                if found: return True
+            st.place(i, d); fixed.append(i)
+        return False
+    finally:
+        for i in reversed(fixed): st.remove(i)
+
+# Techniques (all read the candidate masks of a SolverState)
+def find_hidden_single(st):
+    # where[u][d] with a single bit set means digit d has one place left in unit u
+    g = st.geo
+    for u in range(3 * g.size):
+        for k in range(g.size):
+            m = st.where[u][k]
+            if not m or m & (m - 1): continue
+            cell = g.units[u][g.bit_index[m]]; i, j = g.row_of[cell], g.col_of[cell]; val = k + 1
+            text = unit_label(u, g)[2]
+            return i, j, val, f"{text[0].upper()}{text[1:]} only cell ({i+1},{j+1}) can be {val}."
+    return None
+
+def unit_label(u, g=None):
+    # (kind, index, text) as used in step explanations; boxes with a middle
+    # cell are named after it, the others by number. g defaults to 9x9.
+    g = g or geometry()
+    n = g.size
+    if u < n: return 'row', u, f"row {u+1}"
+    if u < 2 * n: return 'col', u - n, f"column {u-n+1}"
+    box_row, box_col = divmod(u - 2 * n, g.box)
+    if g.box % 2 == 0: return 'box', (box_row, box_col), f"box {u-2*n+1}"
+    mid = g.box // 2 + 1
+    return 'box', (box_row, box_col), f"box centered at ({box_row*g.box+mid},{box_col*g.box+mid})"
+
+SUBSET_NAMES = {2: "Pair", 3: "Trio", 4: "Quad"}
+
+def _cells_text(cells, g=None):
+    g = g or geometry()
+    return ", ".join(f"({g.row_of[i]+1},{g.col_of[i]+1})" for i in cells)
+
+def _naked_in_unit(g, cand, u, size):
+    # Cells with more than `size` candidates can never join, and the search
+    # backs off as soon as the union grows past `size` digits
+    popcount = g.popcount
+    cells = g.units[u]
+    pool = [i for i in cells if 2 <= popcount[cand[i]] <= size]
+    if len(pool) < size: return None
+    def search(start, chosen, union):
+        if len(chosen) == size:
+            elims = tuple((i, cand[i] & union) for i in cells if i not in chosen and cand[i] & union)
+            return (tuple(chosen), union, elims) if elims else None
+        for n in range(start, len(pool) - (size - len(chosen)) + 1):
+            grown = union | cand[pool[n]]
+            if popcount[grown] > size: continue
+            found = search(n + 1, chosen + [pool[n]], grown)
+            if found: return found
+        return None
+    return search(0, [], 0)
+
+def _hidden_in_unit(g, cand, where, u, size):
+    # Same search over digits: `size` digits confined to `size` cells
+    popcount = g.popcount
+    pool = [k for k in range(g.size) if 2 <= popcount[where[k]] <= size]
+    if len(pool) < size: return None
+    def search(start, chosen, union):
+        if len(chosen) == size:
+            digits = 0
+            for k in chosen: digits |= 1 << k
+            cells = tuple(g.units[u][p] for p in range(g.size) if union >> p & 1)
+            elims = tuple((i, cand[i] & ~digits) for i in cells if cand[i] & ~digits)
+            return (cells, digits, elims) if elims else None
+        for n in range(start, len(pool) - (size - len(chosen)) + 1):
+            grown = union | where[pool[n]]
+            if popcount[grown] > size: continue
+            found = search(n + 1, chosen + [pool[n]], grown)
+            if found: return found
+        return None
+    return search(0, [], 0)
+
+def find_subset(st, size, hidden=False):
+    # Naked or hidden pair/trio/quad (size 2-4), scanning only units changed
+    # since this search last came up empty there. Returns a Step or None.
+    name = ("Hidden " if hidden else "Naked ") + SUBSET_NAMES[size]
+    g = st.geo
+    todo = st.pending_units(name); clean = 0
+    for u in range(3 * g.size):
+        if not todo >> u & 1: continue
+        if hidden: found = _hidden_in_unit(g, st.cand, st.where[u], u, size)
+        else: found = _naked_in_unit(g, st.cand, u, size)
+        if found:
+            st.mark_scanned(name, clean)
+            cells, digits, elims = found
+            text = unit_label(u, g)[2]; digits = g.mask_digits[digits]
+            if hidden: explanation = f"{name}: {set(digits)} only fit {_cells_text(cells, g)} in {text}, remove their other candidates."
+            else: explanation = f"{name}: Naked {SUBSET_NAMES[size].lower()} {set(digits)} in {text}, remove from other cells."
+            return Step(name, cells, digits, elims, explanation, None)
+        clean |= 1 << u
+    st.mark_scanned(name, clean)
+    return None
+
+def find_naked_pair(st):
+    return find_subset(st, 2)
+
+def find_naked_trio(st):
+    return find_subset(st, 3)
+
+def _bb_cells(bb):
+    cells = []
+    while bb:
+        low = bb & -bb; bb ^= low
+        cells.append(low.bit_length() - 1)
+    return tuple(cells)
+
+def _elimination_step(name, k, cells, bb, explanation):
+    return Step(name, cells, (k + 1,), tuple((i, 1 << k) for i in _bb_cells(bb)), f"{name}: {explanation}", None)
+
+def find_pointing(st):
+    # A digit confined to one row or column of a box leaves the rest of that line
+    g = st.geo; n = g.size; box = g.box
+    todo = st.pending_units("Pointing"); clean = 0
+    for u in range(2 * n, 3 * n):
+        if not todo >> u & 1: continue
+        b = u - 2 * n
+        for k in range(n):
+            m = st.where[u][k]
+            if g.popcount[m] < 2: continue
+            for t in range(box):
+                if not m & ~g.box_bands[t]: line = (b // box) * box + t
+                elif not m & ~g.box_stacks[t]: line = n + (b % box) * box + t
+                else: continue
+                bb = st.digit_cells(k) & g.unit_bb[line] & ~g.unit_bb[u]
+                if bb:
+                    st.mark_scanned("Pointing", clean)
+                    return _elimination_step("Pointing", k, _bb_cells(st.digit_cells(k) & g.unit_bb[u]), bb,
+                        f"{k+1} in {unit_label(u, g)[2]} lies only on {unit_label(line, g)[2]}, remove it from the rest of that line.")
+        clean |= 1 << u
+    st.mark_scanned("Pointing", clean)
+    return None
+
+def find_box_line(st):
+    # A digit confined to one box within a row or column leaves the rest of that box
+    g = st.geo; n = g.size
+    todo = st.pending_units("Box/Line"); clean = 0
+    for u in range(2 * n):
+        if not todo >> u & 1: continue
+        for k in range(n):
+            m = st.where[u][k]
+            if g.popcount[m] < 2: continue
+            for t in range(g.box):
+                if m & ~g.line_thirds[t]: continue
+                box = 2 * n + ((u // g.box) * g.box + t if u < n else t * g.box + (u - n) // g.box)
+                bb = st.digit_cells(k) & g.unit_bb[box] & ~g.unit_bb[u]
+                if bb:
+                    st.mark_scanned("Box/Line", clean)
+                    return _elimination_step("Box/Line", k, _bb_cells(st.digit_cells(k) & g.unit_bb[u]), bb,
+                        f"{k+1} in {unit_label(u, g)[2]} lies only in {unit_label(box, g)[2]}, remove it from the rest of that box.")
+        clean |= 1 << u
+    st.mark_scanned("Box/Line", clean)
+    return None
+
+FISH_NAMES = {2: "X-Wing", 3: "Swordfish", 4: "Jellyfish"}
+
+def _fish(g, lines, size):
+    # Yields (base lines, cover positions) where `size` lines hold the digit in
+    # at most `size` positions between them
+    popcount = g.popcount
+    pool = [n for n in range(g.size) if 2 <= popcount[lines[n]] <= size]
+    def search(start, chosen, union):
+        if len(chosen) == size:
+            yield chosen, union; return
+        for n in range(start, len(pool) - (size - len(chosen)) + 1):
+            grown = union | lines[pool[n]]
+            if popcount[grown] <= size: yield from search(n + 1, chosen + [pool[n]], grown)
+    if len(pool) >= size: yield from search(0, [], 0)
+
+def find_fish(st, size):
+    # X-Wing, Swordfish or Jellyfish on rows, then on columns, one digit at a
+    # time. Fish span the whole grid, so any change since the last empty scan
+    # means a full rescan.
+    name = FISH_NAMES[size]
+    if not st.pending_units(name): return None
+    g = st.geo; N = g.size
+    for k in range(N):
+        digit_bb = None
+        for base, cover in ((0, N), (N, 0)):
+            for chosen, union in _fish(g, [st.where[base + n][k] for n in range(N)], size):
+                if digit_bb is None: digit_bb = st.digit_cells(k)
+                base_bb = cover_bb = 0
+                for n in chosen: base_bb |= g.unit_bb[base + n]
+                for p in range(N):
+                    if union >> p & 1: cover_bb |= g.unit_bb[cover + p]
+                bb = digit_bb & cover_bb & ~base_bb
+                if not bb: continue
+                kind = ("rows", "columns") if base == 0 else ("columns", "rows")
+                lines = ", ".join(str(n + 1) for n in chosen)
+                covers = ", ".join(str(p + 1) for p in range(N) if union >> p & 1)
+                return _elimination_step(name, k, _bb_cells(digit_bb & base_bb), bb,
+                    f"{k+1} in {kind[0]} {lines} only fits {kind[1]} {covers}, remove it from the rest of those {kind[1]}.")
+    st.mark_scanned(name, st.geo.all_units)
+    return None
+
+# Chain searches are cut off at CHAIN_MAX_DEPTH links (X-chains) or cells
+# (XY-chains). The GUI also gives them CHAIN_TIME_BUDGET seconds, so one Next
+# never stalls; a search that timed out is retried on the next call. Without a
+# time budget the result depends only on the grid.
+CHAIN_MAX_DEPTH = 12
+CHAIN_TIME_BUDGET = 0.05
+
+class ChainTimeout(Exception):
+    pass
+
+def _strong_peers(st, i, k):
+    g = st.geo
+    for u, p in zip(g.cell_units[i], g.pos_in_unit[i]):
+        if st.strong[k] >> u & 1: yield g.units[u][g.bit_index[st.where[u][k] & ~(1 << p)]]
+
+def _two_color(start, neighbours):
+    # Colors the component of start; returns the two color bitboards and
+    # whether some link joined two cells of the same color
+    colors = [1 << start, 0]; stack = [(start, 0)]; clash = False
+    while stack:
+        i, c = stack.pop()
+        for j in neighbours(i):
+            if colors[c] >> j & 1: clash = True
+            elif not colors[1 - c] >> j & 1:
+                colors[1 - c] |= 1 << j; stack.append((j, 1 - c))
+    return colors, clash
+
+def _seeing_both(g, cells_bb, a, b):
+    return sum(1 << i for i in _bb_cells(cells_bb) if g.peer_bb[i] & a and g.peer_bb[i] & b)
+
+def find_simple_coloring(st):
+    # Color each digit's strong-link components: a color with two cells in one
+    # unit is false (color wrap), and a cell seeing both colors loses the digit
+    name = "Simple Coloring"
+    if not st.pending_units(name): return None
+    g = st.geo
+    strong, _ = st.links()
+    for k in range(g.size):
+        if not strong[k]: continue
+        digit_bb = st.digit_cells(k); seen = 0
+        for start in _bb_cells(digit_bb):
+            if seen >> start & 1: continue
+            colors, _ = _two_color(start, lambda i: _strong_peers(st, i, k))
+            seen |= colors[0] | colors[1]
+            if not colors[1]: continue
+            cells = _bb_cells(colors[0] | colors[1])
+            for c in (0, 1):
+                if any(g.peer_bb[i] & colors[c] for i in _bb_cells(colors[c])):
+                    return _elimination_step(name, k, cells, colors[c],
+                        f"two cells of one color see each other in the {k+1} chain through {_cells_text(cells, g)}, so that color cannot be {k+1}.")
+            bb = _seeing_both(g, digit_bb & ~seen, colors[0], colors[1])
+            if bb:
+                return _elimination_step(name, k, cells, bb,
+                    f"one color of the {k+1} chain through {_cells_text(cells, g)} is {k+1}, remove it from cells seeing both colors.")
+    st.mark_scanned(name, st.geo.all_units)
+    return None
+
+def find_remote_pair(st):
+    # Bivalue cells with the same pair, linked by sight, alternate between the
+    # two digits; a cell seeing both colors can hold neither
+    name = "Remote Pair"
+    if not st.pending_units(name): return None
+    g = st.geo
+    _, bivalue = st.links()
+    seen = 0
+    for start in _bb_cells(bivalue):
+        if seen >> start & 1: continue
+        m = st.cand[start]
+        same = sum(1 << i for i in _bb_cells(bivalue) if st.cand[i] == m)
+        colors, clash = _two_color(start, lambda i: _bb_cells(g.peer_bb[i] & same))
+        chain = colors[0] | colors[1]; seen |= chain
+        cells = _bb_cells(chain)
+        if clash or len(cells) < 4: continue
+        targets = sum(1 << i for i in range(g.cells) if st.cand[i] & m) & ~chain
+        bb = _seeing_both(g, targets, colors[0], colors[1])
+        if bb:
+            elims = tuple((i, st.cand[i] & m) for i in _bb_cells(bb))
+            return Step(name, cells, g.mask_digits[m], elims,
+                        f"{name}: {set(g.mask_digits[m])} alternate along {_cells_text(cells, g)}, remove both from cells seeing both colors.", None)
+    st.mark_scanned(name, st.geo.all_units)
+    return None
+
+def _x_chain(st, k, digit_bb, path, used, depth, deadline):
+    # Extends path (ending on its start or after a weak link) by a strong link,
+    # then by a weak link to any peer that still takes the digit
+    if time.perf_counter() > deadline: raise ChainTimeout
+    peer_bb = st.geo.peer_bb
+    for j in _strong_peers(st, path[-1], k):
+        if used >> j & 1: continue
+        path.append(j)
+        if len(path) >= 4:
+            bb = digit_bb & peer_bb[path[0]] & peer_bb[j] & ~used
+            if bb: return list(path), bb
+        if len(path) + 1 <= depth:
+            for w in _bb_cells(digit_bb & peer_bb[j] & ~used):
+                path.append(w)
+                found = _x_chain(st, k, digit_bb, path, used | 1 << j | 1 << w, depth, deadline)
+                if found: return found
+                path.pop()
+        path.pop()
+    return None
+
+def find_x_chain(st, max_depth=None, time_budget=None):
+    # Alternating strong/weak links on one digit, starting and ending strong:
+    # one end holds the digit, so cells seeing both ends lose it
+    name = "X-Chain"
+    if not st.pending_units(name): return None
+    depth = max_depth or CHAIN_MAX_DEPTH
+    deadline = float("inf") if time_budget is None else time.perf_counter() + time_budget
+    g = st.geo
+    strong, _ = st.links()
+    try:
+        for k in range(g.size):
+            if not strong[k]: continue
+            digit_bb = st.digit_cells(k)
+            for start in _bb_cells(digit_bb):
+                found = _x_chain(st, k, digit_bb, [start], 1 << start, depth, deadline)
+                if not found: continue
+                path, bb = found
+                links = "".join(("=" if n % 2 else "-") + _cells_text((i,), g) for n, i in enumerate(path[1:], 1))
+                return _elimination_step(name, k, tuple(path), bb,
+                    f"{_cells_text(path[:1], g)}{links} has {k+1} at one end, remove it from cells seeing both ends.")
+    except ChainTimeout:
+        return None
+    st.mark_scanned(name, st.geo.all_units)
+    return None
+
+def _xy_chain(st, bivalue, z, on, path, used, depth, deadline):
+    # The digit `on` is true in path[-1]; a bivalue peer that also has it must
+    # take its other digit
+    if time.perf_counter() > deadline: raise ChainTimeout
+    g = st.geo
+    for j in _bb_cells(bivalue & g.peer_bb[path[-1]] & ~used):
+        m = st.cand[j]
+        if not m >> on & 1: continue
+        nxt = g.bit_index[m & ~(1 << on)]
+        path.append(j)
+        if nxt == z and len(path) >= 3:
+            bb = st.digit_cells(z) & g.peer_bb[path[0]] & g.peer_bb[j]
+            if bb: return list(path), bb
+        if len(path) < depth:
+            found = _xy_chain(st, bivalue, z, nxt, path, used | 1 << j, depth, deadline)
+            if found: return found
+        path.pop()
+    return None
+
+def find_xy_chain(st, max_depth=None, time_budget=None):
+    # Bivalue cells linked by sight, each passing on its other digit: if the
+    # chain starts and ends on digit z, z sits at one end
+    name = "XY-Chain"
+    if not st.pending_units(name): return None
+    depth = max_depth or CHAIN_MAX_DEPTH
+    deadline = float("inf") if time_budget is None else time.perf_counter() + time_budget
+    g = st.geo
+    _, bivalue = st.links()
+    try:
+        for start in _bb_cells(bivalue):
+            for z in g.mask_digits[st.cand[start]]:
+                z -= 1; on = g.bit_index[st.cand[start] & ~(1 << z)]
+                found = _xy_chain(st, bivalue, z, on, [start], 1 << start, depth, deadline)
+                if not found: continue
+                path, bb = found
+                return _elimination_step(name, z, tuple(path), bb,
+                    f"chain {_cells_text(path, g)} puts {z+1} at one end, remove it from cells seeing both ends.")
+    except ChainTimeout:
+        return None
+    st.mark_scanned(name, st.geo.all_units)
+    return None
+
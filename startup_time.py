@@ -0,0 +1,28 @@
+# Measures a cold `import solver` in fresh interpreters and checks it stays
+# headless. Usage: python startup_time.py [runs] [budget_ms]
+import json
+import os
+import subprocess
+import sys
+
+PROBE = ("import sys, time; t = time.perf_counter(); import solver; "
+         "print((time.perf_counter() - t) * 1000, 'pygame' in sys.modules)")
+# The probe imports solver from here, whatever the caller's working directory
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def measure(runs=10):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True,
+                             cwd=HERE).stdout.split()
+        if out[1] == "True": raise RuntimeError("importing solver pulled in pygame")
+        times.append(float(out[0]))
+    times.sort()
+    return {"runs": runs, "min_ms": times[0], "median_ms": times[len(times) // 2], "max_ms": times[-1]}
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    result = measure(runs)
+    print(json.dumps(result))
+    if result["median_ms"] > budget: sys.exit(f"median import time {result['median_ms']:.2f} ms over budget {budget} ms")
@@ -0,0 +1,60 @@
+# Optional instrumentation: counters and timings recorded by Lock, the step
+# engine and the GUI frame loop while enabled. Call sites test `enabled` once
+# per lock, step or frame and never inside a search, so a disabled run pays
+# one attribute check per call and nothing per node.
+# Usage: SUDOKU_STATS=stats.json python main.py  (F3 shows the overlay)
+import atexit
+import os
+from collections import Counter
+
+enabled = False
+counters = Counter()
+# name -> [calls, total seconds, max seconds]
+timings = {}
+dump_path = None
+
+def enable(path=None):
+    # With a path, the stats are written there as JSON when the process exits
+    global enabled, dump_path
+    enabled = True
+    if path and dump_path is None: atexit.register(_dump_at_exit)
+    if path: dump_path = path
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    counters.clear(); timings.clear()
+
+def count(name, n=1):
+    counters[name] += n
+
+def add_time(name, seconds):
+    t = timings.get(name)
+    if t is None: timings[name] = [1, seconds, seconds]
+    else:
+        t[0] += 1; t[1] += seconds
+        if seconds > t[2]: t[2] = seconds
+
+def snapshot():
+    # JSON-able copy: counters as they are, timings in milliseconds
+    return {
+        "counters": dict(sorted(counters.items())),
+        "timings": {name: {"calls": n, "total_ms": total * 1000, "mean_ms": total * 1000 / n, "max_ms": most * 1000}
+                    for name, (n, total, most) in sorted(timings.items())},
+    }
+
+def dump(path):
+    # json is imported here so that importing solver (which imports this) stays cheap
+    import json
+    with open(path, "w") as f: json.dump(snapshot(), f, indent=2)
+
+def _dump_at_exit():
+    if dump_path: dump(dump_path)
+
+def enable_from_env(var="SUDOKU_STATS"):
+    # SUDOKU_STATS=path turns stats on and dumps them to path on exit
+    path = os.environ.get(var)
+    if path: enable(path)
+    return bool(path)
@@ -0,0 +1,121 @@
+# Step engine behind the Next button: a generator of structured step records
+# over a SolverState, usable one step at a time or drained into a full trace.
+# Usage: python steps.py [puzzle files...] > traces.jsonl  (stdin when no files)
+import json
+import sys
+import time
+import stats
+from solver import (GRID_SIZE, Step, SolverState, parse_grid, find_hidden_single,
+                    find_subset, find_pointing, find_box_line, find_fish,
+                    find_simple_coloring, find_remote_pair, find_x_chain, find_xy_chain)
+
+def eliminations(time_budget=None):
+    # Elimination techniques after the singles, cheapest first, by technique
+    # name. Chain searches give up after time_budget seconds (None: no limit).
+    return [
+        ("Pointing", find_pointing),
+        ("Box/Line", find_box_line),
+        ("Naked Pair", lambda st: find_subset(st, 2)),
+        ("Naked Trio", lambda st: find_subset(st, 3)),
+        ("Hidden Pair", lambda st: find_subset(st, 2, hidden=True)),
+        ("X-Wing", lambda st: find_fish(st, 2)),
+        ("Hidden Trio", lambda st: find_subset(st, 3, hidden=True)),
+        ("Naked Quad", lambda st: find_subset(st, 4)),
+        ("Hidden Quad", lambda st: find_subset(st, 4, hidden=True)),
+        ("Swordfish", lambda st: find_fish(st, 3)),
+        ("Jellyfish", lambda st: find_fish(st, 4)),
+        ("Simple Coloring", find_simple_coloring),
+        ("Remote Pair", find_remote_pair),
+        ("X-Chain", lambda st: find_x_chain(st, time_budget=time_budget)),
+        ("XY-Chain", lambda st: find_xy_chain(st, time_budget=time_budget)),
+    ]
+
+ELIMINATIONS = eliminations()
+
+def _eliminate(st, techniques):
+    for _, technique in techniques:
+        step = technique(st)
+        if step: return step
+    return None
+
+def _eliminate_timed(st, techniques):
+    # _eliminate with per-technique timings, used while stats are enabled
+    for name, technique in techniques:
+        started = time.perf_counter()
+        step = technique(st)
+        stats.add_time("technique " + name, time.perf_counter() - started)
+        if step: return step
+    return None
+
+def _placement(technique, cell, val, explanation):
+    return Step(technique, (cell,), (val,), (), explanation, (cell, val))
+
+def apply_step(st, step):
+    if step.place: st.place(*step.place)
+    for i, mask in step.eliminations: st.eliminate(i, mask)
+
+def iter_steps(st, notes_initialized=False, time_budget=None):
+    # Yields steps in the cascade order of the Next button, applying each to st
+    # before it is yielded. Stops when no technique applies. With time_budget,
+    # chain searches are cut off after that many seconds, so the steps found
+    # may depend on machine load.
+    techniques = ELIMINATIONS if time_budget is None else eliminations(time_budget)
+    while st.empty:
+        # Naked single
+        ns = st.naked_single()
+        if ns:
+            cell, val = ns; r, c = divmod(cell, st.geo.size)
+            step = _placement("Naked Single", cell, val, f"Naked Single: Cell ({r+1},{c+1}) = {val}.")
+        # Hidden single
+        elif (hs := find_hidden_single(st)):
+            i, j, val, explanation_text = hs
+            step = _placement("Hidden Single", i * st.geo.size + j, val, "Hidden Single: " + explanation_text)
+        # Initialize notes (the candidate masks are already current, this only shows them)
+        elif not notes_initialized:
+            notes_initialized = True
+            step = Step("Init Notes", (), (), (), "Initialized notes with all candidates.", None)
+        # Intersections, subsets and fish
+        else:
+            step = (_eliminate_timed if stats.enabled else _eliminate)(st, techniques)
+            if step is None: return
+        apply_step(st, step)
+        yield step
+
+def trace(grid):
+    # Full logical solve path of a grid of any supported size: (steps, solved)
+    st = SolverState(grid)
+    if not st.consistent: return [], False
+    steps = list(iter_steps(st))
+    return steps, st.empty == 0
+
+def step_to_json(step, size=GRID_SIZE):
+    rc = lambda i: [i // size + 1, i % size + 1]
+    digits = lambda m: [k + 1 for k in range(size) if m >> k & 1]
+    return {
+        "technique": step.technique,
+        "cells": [rc(i) for i in step.cells],
+        "digits": list(step.digits),
+        "eliminations": [[rc(i), digits(m)] for i, m in step.eliminations],
+        "explanation": step.explanation,
+    }
+
+def export_traces(lines, out):
+    # One JSON line per puzzle, written as soon as its trace is done; a
+    # malformed line gets an error record instead
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"): continue
+        try: grid = parse_grid(line)
+        except ValueError as e:
+            out.write(json.dumps({"puzzle": line, "error": str(e)}) + "\n"); continue
+        steps, solved = trace(grid)
+        out.write(json.dumps({"puzzle": line, "solved": solved, "steps": [step_to_json(s, len(grid)) for s in steps]}) + "\n")
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths: export_traces(sys.stdin, sys.stdout)
+    for path in paths:
+        with open(path) as f: export_traces(f, sys.stdout)
+
+if __name__ == "__main__":
+    main()